@@ -0,0 +1,294 @@
+"""Lightweight stand-ins for the discord.py objects the cogs touch.
+
+They implement just enough of each model for the benchmarked code paths
+and never touch the network; REST calls complete immediately and are
+recorded so a benchmark can check what would have been sent.
+"""
+import datetime
+import itertools
+import types
+
+import discord
+
+_ids = itertools.count(1_000_000_000_000_000_000)
+
+
+def snowflake():
+    return next(_ids)
+
+
+class FakeAsset:
+    def __init__(self, url):
+        self.url = url
+
+
+class FakePermissions:
+    def __init__(self, administrator=False):
+        self.administrator = administrator
+
+
+class FakeRole:
+    def __init__(self, guild, name, position=0):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self.members = []
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def is_default(self):
+        return self.id == self.guild.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+    def __ge__(self, other):
+        return self.position >= other.position
+
+
+class FakeUser:
+    def __init__(self, name="user", bot=False, guild=None):
+        self.id = snowflake()
+        self.name = name
+        self.display_name = name
+        self.display_avatar = FakeAsset(f"https://cdn.example/avatars/{self.id}.png")
+        self.bot = bot
+        self.guild = guild
+        self.roles = []
+        self.top_role = guild.default_role if guild else None
+        self.guild_permissions = FakePermissions()
+        self.sent = []
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def get_role(self, role_id):
+        return discord.utils.get(self.roles, id=role_id)
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.roles = [role for role in self.roles if role not in roles]
+
+
+FakeMember = FakeUser
+
+
+class FakeEmoji:
+    def __init__(self, guild, name):
+        self.id = snowflake()
+        self.guild_id = guild.id
+        self.name = name
+        self.animated = False
+
+    def __str__(self):
+        return f"<:{self.name}:{self.id}>"
+
+
+class FakeWebhook:
+    def __init__(self, channel, name):
+        self.id = snowflake()
+        self.channel = channel
+        self.name = name
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content="", embeds=None, attachments=None):
+        self.id = snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = embeds or []
+        self.attachments = attachments or []
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.deleted = False
+
+    async def delete(self, **kwargs):
+        self.deleted = True
+
+
+class FakeTextChannel:
+    def __init__(self, guild, name, category=None, topic=None, overwrites=None):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.category = category
+        self.topic = topic
+        self.overwrites = overwrites or {}
+        self.messages = []
+        self.webhook_list = []
+        self.deleted = False
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def send(self, content=None, embed=None, **kwargs):
+        message = FakeMessage(self, self.guild.me, content or "", embeds=[embed] if embed else None)
+        self.messages.append(message)
+        return message
+
+    async def history(self, limit=100, oldest_first=None, **kwargs):
+        messages = self.messages if oldest_first else reversed(self.messages)
+        for message in itertools.islice(messages, limit):
+            yield message
+
+    async def webhooks(self):
+        return list(self.webhook_list)
+
+    async def create_webhook(self, name, **kwargs):
+        webhook = FakeWebhook(self, name)
+        self.webhook_list.append(webhook)
+        return webhook
+
+    async def delete(self, **kwargs):
+        self.deleted = True
+        self.guild.channels.pop(self.id, None)
+
+
+class FakeGuild:
+    def __init__(self, name="guild", emojis=()):
+        self.id = snowflake()
+        self.name = name
+        self.channels = {}
+        self.members = {}
+        self.roles = {}
+        self.default_role = self.add_role("@everyone")
+        self.default_role.id = self.id
+        self.roles = {self.id: self.default_role}
+        self.me = self.add_member("Canopus", bot=True)
+        self.emojis = [FakeEmoji(self, name) for name in emojis]
+
+    def add_role(self, name, position=0):
+        role = FakeRole(self, name, position)
+        self.roles[role.id] = role
+        return role
+
+    def add_member(self, name, bot=False):
+        member = FakeMember(name, bot=bot, guild=self)
+        self.members[member.id] = member
+        return member
+
+    def add_text_channel(self, name, **kwargs):
+        channel = FakeTextChannel(self, name, **kwargs)
+        self.channels[channel.id] = channel
+        return channel
+
+    @property
+    def chunked(self):
+        return True
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    async def create_text_channel(self, name, **kwargs):
+        return self.add_text_channel(name, **kwargs)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.sent.append((content, kwargs))
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.sent.append((content, kwargs))
+
+
+class FakeInteraction:
+    def __init__(self, client, guild, user, channel):
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.command = None
+        self.extras = {}
+        self.sent = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, **kwargs):
+        self.sent.append((kwargs.get('content'), kwargs))
+
+
+class FakeBot:
+    """Just enough of ``CanopusBot`` for cogs constructed outside a real client"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.scheduler = None
+        self.guilds = []
+        self.cogs = {}
+        # Users the client has cached. Like the real client under the lazy
+        # and minimal cache profiles, guild members are not in here
+        self.users = {}
+        self.user = types.SimpleNamespace(id=snowflake())
+
+    def is_ready(self):
+        return True
+
+    async def wait_until_ready(self):
+        return None
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def get_channel(self, channel_id):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        return None
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
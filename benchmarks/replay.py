@@ -0,0 +1,355 @@
+"""Replay gateway event streams through a real ``CanopusBot``.
+
+Run from the repository root::
+
+    python -m benchmarks.replay --guilds 50 --events 20000 --rate 2000
+    python -m benchmarks.replay --record stream.jsonl --events 5000
+    python -m benchmarks.replay --input stream.jsonl --rate 0
+    python -m benchmarks.replay --cache-profile full
+
+The bot is built exactly as in production, with every cog loaded, but it
+never connects. Dispatch frames go straight to the parsers the gateway
+would call. REST calls and webhook/interaction responses are answered by
+in-process stubs. Streams are JSON lines of ``{"t": EVENT, "d": payload}``
+frames, optionally with an ``"at"`` offset in seconds. They are either
+synthesized (guilds, members, messages, joins and slash commands) or read
+from ``--input``. GUILD_CREATE frames are fed up front and are not timed.
+
+Reported: offered and achieved events per second, p50/p99 latency of
+listeners and app commands, and resident memory after loading the guilds
+and at peak.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import discord
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+from benchmarks.run import git_revision, summarize
+from main import CanopusBot
+from utils.cache import CACHE_PROFILES
+from utils.metrics import Histogram
+
+# CanopusBot needs no token since it never logs in, and nothing should
+# bind a metrics port or touch the real database
+os.environ.setdefault("APP_ID", "1")
+os.environ["METRICS_PORT"] = ""
+os.environ["DATABASE_PATH"] = "canopus.db"
+
+_ids = itertools.count(1_100_000_000_000_000_000)
+EMOJI_NAMES = ["wave", "party", "shipit", "thumbsup", "rocket", "eyes", "fire", "tada"]
+MESSAGES = [
+    "just a plain message without any tokens",
+    "see you at 12:30, ratio 3:2",
+    "hello :wave: everyone",
+    "ship it :shipit: :rocket:",
+    "nothing to see here :notanemoji: really",
+]
+
+
+def snowflake():
+    return str(next(_ids))
+
+
+def timestamp():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def user_payload(name, bot=False):
+    return {"id": snowflake(), "username": name, "discriminator": "0", "global_name": name,
+            "avatar": None, "bot": bot}
+
+
+def member_payload(user, permissions="0"):
+    return {"user": user, "roles": [], "joined_at": timestamp(), "deaf": False, "mute": False,
+            "flags": 0, "permissions": permissions}
+
+
+def message_payload(channel_id, author, content="", guild_id=None):
+    payload = {"id": snowflake(), "channel_id": str(channel_id), "author": author, "content": content,
+               "timestamp": timestamp(), "edited_timestamp": None, "tts": False, "mention_everyone": False,
+               "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "pinned": False,
+               "type": 0, "flags": 0}
+    if guild_id is not None:
+        payload["guild_id"] = str(guild_id)
+    return payload
+
+
+def guild_payload(index, members, channels):
+    guild_id = snowflake()
+    return {
+        "id": guild_id, "name": f"guild-{index}", "icon": None, "owner_id": members[0]["user"]["id"],
+        "features": [], "large": False, "member_count": len(members), "unavailable": False,
+        "roles": [{"id": guild_id, "name": "@everyone", "permissions": "2248473465835073", "position": 0,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0}],
+        "emojis": [{"id": snowflake(), "name": name, "animated": False, "available": True,
+                    "require_colons": True, "managed": False, "roles": []} for name in EMOJI_NAMES],
+        "channels": [{"id": snowflake(), "type": 0, "name": f"channel-{i}", "position": i,
+                      "permission_overwrites": [], "nsfw": False} for i in range(channels)],
+        "members": members, "presences": [], "voice_states": [], "threads": [], "stickers": [],
+        "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+    }
+
+
+def synthesize(guilds, members, channels, events, mix, seed=0):
+    """A stream of GUILD_CREATEs followed by ``events`` mixed dispatches"""
+    rng = random.Random(seed)
+    created = []
+    for index in range(guilds):
+        guild_members = [member_payload(user_payload(f"member-{index}-{i}")) for i in range(members)]
+        created.append(guild_payload(index, guild_members, channels))
+        yield {"t": "GUILD_CREATE", "d": created[-1]}
+
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    for _ in range(events):
+        guild = rng.choice(created)
+        channel = rng.choice(guild["channels"])
+        member = rng.choice(guild["members"])
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "message":
+            data = message_payload(channel["id"], member["user"], rng.choice(MESSAGES), guild["id"])
+            data["member"] = {key: value for key, value in member.items() if key != "user"}
+            yield {"t": "MESSAGE_CREATE", "d": data}
+        elif kind == "join":
+            yield {"t": "GUILD_MEMBER_ADD", "d": dict(member_payload(user_payload("newcomer")), guild_id=guild["id"])}
+        else:
+            command = rng.choice([
+                {"name": "tasklist", "options": []},
+                {"name": "remindme", "options": [{"name": "time", "type": 4, "value": 30},
+                                                 {"name": "unit", "type": 3, "value": "m"},
+                                                 {"name": "message", "type": 3, "value": "stand up"}]},
+            ])
+            yield {"t": "INTERACTION_CREATE", "d": {
+                "id": snowflake(), "application_id": os.environ["APP_ID"], "type": 2, "token": "replay", "version": 1,
+                "guild_id": guild["id"], "channel_id": channel["id"],
+                "channel": dict(channel, guild_id=guild["id"]),
+                "member": member_payload(member["user"], permissions="2248473465835073"),
+                "data": {"id": snowflake(), "type": 1, **command},
+                "app_permissions": "2248473465835073", "locale": "en-US", "guild_locale": "en-US",
+                "entitlements": [], "authorizing_integration_owners": {}, "context": 0,
+                "attachment_size_limit": 10485760,
+            }}
+
+
+class SampledHistogram(Histogram):
+    """Histogram that also keeps every raw sample, for exact percentiles"""
+
+    def __init__(self, histogram):
+        super().__init__(histogram.name, histogram.help, histogram.labels, histogram.buckets)
+        self.samples = []
+
+    def observe(self, value, *labels):
+        super().observe(value, *labels)
+        self.samples.append(value)
+
+
+class StubWebhookAdapter(AsyncWebhookAdapter):
+    """Answers interaction callbacks and webhook executions without a network"""
+
+    def __init__(self, bot_user):
+        super().__init__()
+        self.bot_user = bot_user
+        self.requests = 0
+
+    async def request(self, route, session, **kwargs):
+        self.requests += 1
+        if route.path.endswith('/callback'):
+            return {"interaction": {"id": str(route.webhook_id), "type": 2}}
+        if route.method in ('POST', 'PATCH'):
+            return message_payload(route.channel_id or 0, self.bot_user)
+        return None
+
+
+def stub_http(bot):
+    """Replace REST calls with canned responses; returns the request counter"""
+    bot_user = bot.user._to_minimal_user_json()
+    calls = {"count": 0}
+
+    async def request(route, **kwargs):
+        calls["count"] += 1
+        path = route.path
+        if route.method == 'POST' and path == '/channels/{channel_id}/messages':
+            return message_payload(route.channel_id, bot_user)
+        if route.method == 'POST' and path == '/channels/{channel_id}/webhooks':
+            return {"id": snowflake(), "type": 1, "name": kwargs.get('json', {}).get('name', 'webhook'),
+                    "channel_id": str(route.channel_id), "token": "replay", "user": bot_user}
+        if route.method == 'GET' and path.endswith('/webhooks'):
+            return []
+        if route.method == 'PUT' and path.endswith('/commands'):
+            return []
+        return None
+
+    bot.http.request = request
+    bot.metrics.instrument_http(bot.http)
+    return calls
+
+
+def rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# Background timers that are not part of handling an event: the scheduler
+# waiting for its next job and the batched commit/flush windows
+TIMERS = {'Event.wait', 'Storage._commit_later', 'WriteBehindFlusher._flush_later'}
+
+
+async def drain(tracked, timeout):
+    """Wait for every task the replay caused, bar background timers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pending = [task for task in tracked if not task.done()
+                   and getattr(task.get_coro(), '__qualname__', '') not in TIMERS]
+        if not pending:
+            return True
+        await asyncio.wait(pending, timeout=min(1.0, deadline - time.monotonic()))
+    return False
+
+
+async def replay(frames, rate, timeout):
+    bot = CanopusBot()
+    await bot._async_setup_hook()
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=user_payload("Canopus", bot=True))
+    http_calls = stub_http(bot)
+    adapter = StubWebhookAdapter(bot.user._to_minimal_user_json())
+    async_context.set(adapter)
+
+    for name in ('listeners', 'commands', 'components'):
+        setattr(bot.metrics, name, SampledHistogram(getattr(bot.metrics, name)))
+
+    tracked = []
+    loop = asyncio.get_running_loop()
+
+    def track(loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        tracked.append(task)
+        return task
+
+    await bot.setup_hook()
+    bot._ready.set()
+    loop.set_task_factory(track)
+    try:
+        setup = [frame for frame in frames if frame["t"] == "GUILD_CREATE"]
+        events = [frame for frame in frames if frame["t"] != "GUILD_CREATE"]
+        for frame in setup:
+            state.parsers["GUILD_CREATE"](frame["d"])
+        welcome = bot.get_cog("WelcomeCog")
+        for guild in bot.guilds:
+            welcome.welcome_channels[guild.id] = guild.text_channels[0].id
+        await drain(tracked, timeout)
+        tracked.clear()
+        rss_after_setup = rss_mb()
+
+        started = time.perf_counter()
+        for index, frame in enumerate(events):
+            due = index / rate if rate else frame.get("at")
+            if due is not None:
+                delay = started + due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            state.parsers[frame["t"]](frame["d"])
+            if not rate and due is None:
+                # Let handlers interleave with the feed, as the gateway reader would
+                await asyncio.sleep(0)
+        fed = time.perf_counter() - started
+        drained = await drain(tracked, timeout)
+        elapsed = time.perf_counter() - started
+
+        listeners = bot.metrics.listeners.samples
+        commands = bot.metrics.commands.samples
+        return {
+            "guilds": len(bot.guilds),
+            "members": sum(guild.member_count or 0 for guild in bot.guilds),
+            "events": len(events),
+            "event_types": {name: sum(frame["t"] == name for frame in events) for name in {f["t"] for f in events}},
+            "offered_rate": round(len(events) / fed, 1) if fed else None,
+            "events_per_sec": round(len(events) / elapsed, 1),
+            "seconds": round(elapsed, 6),
+            "drained": drained,
+            "listener_latency": summarize(listeners) if listeners else None,
+            "command_latency": summarize(commands) if commands else None,
+            "handler_latency": summarize(listeners + commands) if listeners or commands else None,
+            "rest_calls": http_calls["count"],
+            "webhook_calls": adapter.requests,
+            "rss_after_setup_mb": rss_after_setup,
+            "peak_rss_mb": rss_mb(),
+        }
+    finally:
+        loop.set_task_factory(None)
+        await bot.close()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("message", "join", "interaction"):
+            raise argparse.ArgumentTypeError(f"unknown event kind {kind!r}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", help="replay this JSON lines stream instead of synthesizing one")
+    parser.add_argument("--record", help="write the synthesized stream here as JSON lines")
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--members", type=int, default=100, help="members per guild")
+    parser.add_argument("--channels", type=int, default=5, help="text channels per guild")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("message=70,join=10,interaction=20"),
+                        help="relative weights of message, join and interaction events")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="events per second; 0 feeds as fast as possible (or at recorded offsets)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for handlers to finish")
+    parser.add_argument("--cache-profile", choices=CACHE_PROFILES, default=os.getenv("CACHE_PROFILE", "lazy"),
+                        help="CACHE_PROFILE the bot runs with")
+    parser.add_argument("--output", default="benchmarks/replay.json", help="where to write the JSON results")
+    args = parser.parse_args()
+    os.environ["CACHE_PROFILE"] = args.cache_profile
+
+    if args.input:
+        with open(args.input) as f:
+            frames = [json.loads(line) for line in f if line.strip()]
+    else:
+        frames = list(synthesize(args.guilds, args.members, args.channels, args.events, args.mix, args.seed))
+        if args.record:
+            with open(args.record, "w") as f:
+                f.writelines(json.dumps(frame) + "\n" for frame in frames)
+
+    output = os.path.abspath(args.output)
+    revision = git_revision()
+    with tempfile.TemporaryDirectory() as directory:
+        # The bot writes its database and transcripts relative to here
+        os.chdir(directory)
+        results = asyncio.run(replay(frames, args.rate, args.timeout))
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": revision,
+        "python": sys.version.split()[0],
+        "rate": args.rate,
+        "cache_profile": args.cache_profile,
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
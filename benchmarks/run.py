@@ -0,0 +1,286 @@
+"""Offline micro-benchmarks for the bot's hot paths.
+
+Run from the repository root::
+
+    python -m benchmarks.run                      # everything
+    python -m benchmarks.run emoji tasklist       # a subset
+    python -m benchmarks.run --scale 0.1 --output results.json
+
+Nothing touches the network: cogs are built around a :class:`FakeBot` and
+a throwaway SQLite database, and Discord objects are the stand-ins from
+:mod:`benchmarks.fakes`. Results are printed and written as JSON so runs
+can be compared.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction, FakeMessage
+from utils.scheduler import Scheduler
+from utils.storage import Storage
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__.removeprefix('bench_')] = func
+    return func
+
+
+def summarize(latencies, elapsed=None):
+    """Throughput and latency percentiles for a list of per-op seconds"""
+    elapsed = sum(latencies) if elapsed is None else elapsed
+    ordered = sorted(latencies)
+    return {
+        "ops": len(ordered),
+        "seconds": round(elapsed, 6),
+        "ops_per_sec": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+    }
+
+
+async def measure(calls):
+    """Await each zero-argument coroutine function in turn, timing every call"""
+    latencies = []
+    started = time.perf_counter()
+    for call in calls:
+        t = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+@benchmark
+async def bench_emoji(bot, scale):
+    """:name: expansion and the full on_message proxy path"""
+    from events.on_message import emoji
+
+    guilds = [FakeGuild(f"guild-{i}", [f"emoji_{i}_{j}" for j in range(50)] + ["shared", "wave"])
+              for i in range(100)]
+    bot.guilds = guilds
+    cog = emoji(bot)
+    cog.index.rebuild(guilds)
+
+    guild = guilds[0]
+    channel = guild.add_text_channel("general")
+    author = guild.add_member("author")
+    corpus = [
+        "just a plain message without any tokens",
+        "a time like 12:30 or a ratio 3:2 is not an emoji",
+        "hello :wave: everyone",
+        ":emoji_0_1: and :emoji_42_7: and :missing: and <:rendered:123>",
+        "long message " * 40 + ":shared:",
+    ]
+    n = int(20000 * scale)
+    messages = [corpus[i % len(corpus)] for i in range(n)]
+
+    latencies = []
+    started = time.perf_counter()
+    for content in messages:
+        t = time.perf_counter()
+        cog.expand(content, guild.id)
+        latencies.append(time.perf_counter() - t)
+    expand = summarize(latencies, time.perf_counter() - started)
+
+    fakes = [FakeMessage(channel, author, content) for content in messages]
+    on_message = await measure(lambda message=message: cog.on_message(message) for message in fakes)
+    return {"expand": expand, "on_message": on_message}
+
+
+@benchmark
+async def bench_tickets(bot, scale):
+    """Ticket creation and closing, transcript and archive included"""
+    import cogs.tickets
+    cogs.tickets.TICKET_CLOSE_DELAY = 0
+
+    guild = FakeGuild("tickets")
+    bot.guilds = [guild]
+    category = guild.add_text_channel("Tickets")
+    support = guild.add_role("Support")
+    await bot.storage.execute(
+        "INSERT INTO ticket_config (guild_id, category_id, support_role_id, ticket_counter) VALUES (?, ?, ?, 0)",
+        (guild.id, category.id, support.id)
+    )
+    cog = cogs.tickets.TicketCog(bot)
+    lobby = guild.add_text_channel("lobby")
+
+    n = int(300 * scale) or 1
+    users = [guild.add_member(f"user-{i}") for i in range(n)]
+    create = await measure(
+        lambda user=user: cog.create_ticket(FakeInteraction(bot, guild, user, lobby)) for user in users
+    )
+
+    tickets = [channel for channel in guild.channels.values() if channel.name.startswith("ticket-")]
+    for channel in tickets:
+        for i in range(50):
+            channel.messages.append(FakeMessage(channel, users[i % len(users)], f"message {i} in {channel.name}"))
+    closer = guild.add_member("support")
+    close = await measure(
+        lambda channel=channel: cog.close_ticket(FakeInteraction(bot, guild, closer, channel), "txt", False)
+        for channel in tickets
+    )
+    return {"create": create, "close": close, "messages_per_transcript": 50}
+
+
+@benchmark
+async def bench_log_action(bot, scale):
+    """Moderation log writes, until they are durable"""
+    from cogs.moderation import ModerationCog
+
+    cog = ModerationCog(bot)
+    n = int(20000 * scale)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        cog.log_action("1234", "warn", "moderator#0001", f"member{i}", "benchmark")
+        latencies.append(time.perf_counter() - t)
+    queued = time.perf_counter() - started
+    await bot.storage.commit()
+    durable = time.perf_counter() - started
+    return {"log_action": summarize(latencies, queued), "durable_seconds": round(durable, 6),
+            "durable_ops_per_sec": round(n / durable, 1)}
+
+
+@benchmark
+async def bench_scheduler(bot, scale):
+    """Reminder scheduling and delivery with 10^5 pending jobs"""
+    from cogs.utility import UtilityCog
+
+    guild = FakeGuild("reminders")
+    bot.guilds = [guild]
+    channel = guild.add_text_channel("general")
+    user = guild.add_member("reminded")
+    bot.scheduler = Scheduler(bot)
+    cog = UtilityCog(bot)
+
+    n = int(100000 * scale)
+    delivered = 0
+    done = asyncio.Event()
+
+    async def send_reminder(reminder):
+        nonlocal delivered
+        await cog.send_reminder(reminder)
+        delivered += 1
+        if delivered == n:
+            done.set()
+
+    bot.scheduler.register('reminder', send_reminder)
+    payload = json.dumps({"channel_id": channel.id, "user_id": user.id, "message": "benchmark"})
+    now = time.time()
+    await bot.storage.executemany(
+        "INSERT INTO scheduled_jobs (kind, due, payload) VALUES ('reminder', ?, ?)",
+        ((now - n + i, payload) for i in range(n))
+    )
+    await bot.storage.commit()
+
+    scheduled = await measure(
+        lambda i=i: bot.scheduler.schedule('reminder', now + 86400 + i, {"channel_id": channel.id})
+        for i in range(min(n, 5000))
+    )
+
+    started = time.perf_counter()
+    await bot.scheduler.start()
+    loaded = time.perf_counter() - started
+    await done.wait()
+    delivery = time.perf_counter() - started
+    await bot.scheduler.stop()
+    return {"pending_jobs": n + scheduled["ops"], "schedule": scheduled, "start_seconds": round(loaded, 6),
+            "delivery_seconds": round(delivery, 6), "deliveries_per_sec": round(n / delivery, 1)}
+
+
+@benchmark
+async def bench_tasklist(bot, scale):
+    """/tasklist query and embed rendering"""
+    from cogs.project_management import ProjectManagementCog
+
+    guild = FakeGuild("tasks")
+    lobby = guild.add_text_channel("general")
+    members = [guild.add_member(f"member-{i}") for i in range(20)]
+    await bot.storage.executemany(
+        "INSERT INTO tasks (guild_id, id, title, description, assignee, creator, deadline, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(guild.id, i, f"Task {i}", "benchmark task", members[i % 20].id, members[0].id, "2030-01-01",
+          "done" if i % 3 else "pending") for i in range(1, 26)]
+    )
+    await bot.storage.commit()
+    cog = ProjectManagementCog(bot)
+
+    n = int(2000 * scale) or 1
+    every = await measure(
+        lambda: cog.tasklist.callback(cog, FakeInteraction(bot, guild, members[0], lobby)) for _ in range(n)
+    )
+    filtered = await measure(
+        lambda: cog.tasklist.callback(cog, FakeInteraction(bot, guild, members[0], lobby), "PENDING")
+        for _ in range(n)
+    )
+    return {"all": every, "by_status": filtered, "tasks": 25}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(names, scale):
+    results = {}
+    for name in names:
+        # Every benchmark gets a fresh database and working directory
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            storage = Storage(os.path.join(directory, "bench.db"))
+            await storage.connect()
+            try:
+                started = time.perf_counter()
+                results[name] = await BENCHMARKS[name](FakeBot(storage), scale)
+                results[name]["wall_seconds"] = round(time.perf_counter() - started, 6)
+            finally:
+                await storage.close()
+                os.chdir(cwd)
+        print(f"{name}: {json.dumps(results[name])}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"benchmarks to run, any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every workload size by this")
+    parser.add_argument("--output", default="benchmarks/results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    output = os.path.abspath(args.output)
+    results = asyncio.run(run(args.benchmarks or list(BENCHMARKS), args.scale))
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
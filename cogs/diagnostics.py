@@ -0,0 +1,211 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Literal, Optional
+import asyncio
+import cProfile
+import inspect
+import io
+import pstats
+import re
+import tracemalloc
+
+# Lines of profiler / allocation output attached to the response
+REPORT_LINES = 40
+TRACEMALLOC_FRAMES = 10
+
+async def is_owner(interaction: discord.Interaction) -> bool:
+    return await interaction.client.is_owner(interaction.user)
+
+class DiagnosticsCog(commands.Cog):
+    """Owner-only profiling of the running bot; every command here touches the whole process"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.busy = asyncio.Lock()
+        self.baseline = None
+
+    def cog_unload(self):
+        if self.baseline is not None:
+            tracemalloc.stop()
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.CheckFailure):
+            await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+
+    def resolve_target(self, target: Optional[str]):
+        """Source file of a cog or command, used to filter reports"""
+        if not target:
+            return None
+        cog = self.bot.get_cog(target)
+        if cog is not None:
+            return inspect.getfile(type(cog))
+        command = self.bot.tree.get_command(target)
+        if command is not None and hasattr(command, 'callback'):
+            return inspect.getfile(command.callback)
+        raise ValueError(f"No cog or command named `{target}`")
+
+    async def target_autocomplete(self, interaction: discord.Interaction, current: str):
+        names = list(self.bot.cogs) + [command.name for command in self.bot.tree.get_commands()]
+        return [app_commands.Choice(name=name, value=name)
+                for name in names if current.lower() in name.lower()][:25]
+
+    async def _start(self, interaction: discord.Interaction, target: Optional[str]):
+        try:
+            filename = self.resolve_target(target)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return None, False
+        if self.busy.locked():
+            await interaction.response.send_message("A profiling session is already running.", ephemeral=True)
+            return None, False
+        # Taken before the defer awaits, so a second session is refused
+        # rather than queued; the caller releases it
+        await self.busy.acquire()
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+        except BaseException:
+            self.busy.release()
+            raise
+        return filename, True
+
+    @app_commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.check(is_owner)
+    @app_commands.describe(target="Only report functions from this cog or command", seconds="How long to profile for")
+    @app_commands.autocomplete(target=target_autocomplete)
+    async def profile(self, interaction: discord.Interaction, target: Optional[str] = None,
+                      seconds: app_commands.Range[int, 1, 600] = 30,
+                      sort: Literal["cumulative", "tottime", "calls"] = "cumulative"):
+        """Profile the bot for a while and report the hottest functions"""
+        filename, started = await self._start(interaction, target)
+        if not started:
+            return
+
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+        finally:
+            self.busy.release()
+
+        report = await asyncio.to_thread(self._profile_report, profiler, sort, filename)
+        await interaction.followup.send(
+            f"Profiled {target or 'the whole bot'} for {seconds}s.",
+            file=discord.File(io.BytesIO(report.encode()), filename="profile.txt"),
+            ephemeral=True
+        )
+
+    @staticmethod
+    def _profile_report(profiler, sort, filename):
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats(sort)
+        if filename:
+            stats.print_stats(re.escape(filename), REPORT_LINES)
+        else:
+            stats.print_stats(REPORT_LINES)
+        return output.getvalue()
+
+    @app_commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.check(is_owner)
+    @app_commands.describe(target="Only report allocations from this cog or command", seconds="How long to trace for")
+    @app_commands.autocomplete(target=target_autocomplete)
+    async def tracealloc(self, interaction: discord.Interaction, target: Optional[str] = None,
+                         seconds: app_commands.Range[int, 1, 600] = 30):
+        """Trace memory allocations for a while and report where they grew"""
+        filename, started = await self._start(interaction, target)
+        if not started:
+            return
+
+        try:
+            was_tracing = tracemalloc.is_tracing()
+            if not was_tracing:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            try:
+                before = await asyncio.to_thread(tracemalloc.take_snapshot)
+                await asyncio.sleep(seconds)
+                after = await asyncio.to_thread(tracemalloc.take_snapshot)
+            finally:
+                if not was_tracing:
+                    tracemalloc.stop()
+        finally:
+            self.busy.release()
+
+        report = await asyncio.to_thread(self._allocation_report, after, before, filename)
+        await interaction.followup.send(
+            f"Traced allocations in {target or 'the whole bot'} for {seconds}s.",
+            file=discord.File(io.BytesIO(report.encode()), filename="allocations.txt"),
+            ephemeral=True
+        )
+
+    @app_commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.check(is_owner)
+    async def heapsnapshot(self, interaction: discord.Interaction):
+        """Take a baseline heap snapshot for /heapdiff"""
+        if self.busy.locked():
+            return await interaction.response.send_message("A profiling session is already running.", ephemeral=True)
+        async with self.busy:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.baseline = await asyncio.to_thread(tracemalloc.take_snapshot)
+            current, peak = tracemalloc.get_traced_memory()
+        await interaction.response.send_message(
+            f"Heap snapshot taken ({current / 1024 / 1024:.1f} MiB traced). Allocation tracing stays on until /heapdiff.",
+            ephemeral=True
+        )
+
+    @app_commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.check(is_owner)
+    @app_commands.describe(target="Only report allocations from this cog or command", stop="Stop tracing afterwards")
+    @app_commands.autocomplete(target=target_autocomplete)
+    async def heapdiff(self, interaction: discord.Interaction, target: Optional[str] = None, stop: bool = True):
+        """Compare the heap against the /heapsnapshot baseline"""
+        if self.baseline is None:
+            return await interaction.response.send_message("Take a baseline with /heapsnapshot first.", ephemeral=True)
+        try:
+            filename = self.resolve_target(target)
+        except ValueError as e:
+            return await interaction.response.send_message(str(e), ephemeral=True)
+        if self.busy.locked():
+            return await interaction.response.send_message("A profiling session is already running.", ephemeral=True)
+        if not tracemalloc.is_tracing():
+            self.baseline = None
+            return await interaction.response.send_message(
+                "Allocation tracing was stopped, so the baseline is gone. Take a new one with /heapsnapshot.",
+                ephemeral=True
+            )
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        async with self.busy:
+            snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+            report = await asyncio.to_thread(self._allocation_report, snapshot, self.baseline, filename)
+            if stop:
+                self.baseline = None
+                tracemalloc.stop()
+
+        await interaction.followup.send(
+            "Heap growth since the baseline snapshot.",
+            file=discord.File(io.BytesIO(report.encode()), filename="heapdiff.txt"),
+            ephemeral=True
+        )
+
+    @staticmethod
+    def _allocation_report(after, before, filename):
+        if filename:
+            filters = [tracemalloc.Filter(True, filename, all_frames=True)]
+            after, before = after.filter_traces(filters), before.filter_traces(filters)
+        differences = after.compare_to(before, 'lineno')
+        lines = [str(difference) for difference in differences[:REPORT_LINES]]
+        growth = sum(difference.size_diff for difference in differences)
+        lines.append(f"\nTotal: {growth / 1024:+.1f} KiB")
+        return "\n".join(lines)
+
+async def setup(bot):
+    await bot.add_cog(DiagnosticsCog(bot))
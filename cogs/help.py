@@ -3,6 +3,8 @@ from discord import app_commands
 from discord.ext import commands
 from typing import Optional, List
 
+from utils.metrics import timed_callback
+
 class CategorySelect(discord.ui.Select):
     def __init__(self, help_command):
         self.help_command = help_command
@@ -50,6 +52,7 @@ class CategorySelect(discord.ui.Select):
             custom_id="category_select"
         )
 
+    @timed_callback
     async def callback(self, interaction: discord.Interaction):
         await self.help_command.show_category(interaction, self.values[0])
 
@@ -71,6 +74,7 @@ class HomeButton(discord.ui.Button):
         )
         self.help_command = help_command
 
+    @timed_callback
     async def callback(self, interaction: discord.Interaction):
         await self.help_command.show_home_page(interaction)
 
@@ -92,6 +96,7 @@ class HelpCog(commands.GroupCog, name="help"):
                 "commands": [
                     ("kick", "Kick a member from the server"),
                     ("ban", "Ban a member from the server"),
+                    ("massban", "Ban many users at once"),
                     ("timeout", "Timeout a member temporarily"),
                     ("warn", "Warn a member"),
                     ("mute", "Mute a member"),
@@ -138,8 +143,12 @@ class HelpCog(commands.GroupCog, name="help"):
                     ("tasklist", "View all tasks"),
                     ("taskdelete", "Delete a task"),
                     ("meeting", "Schedule a meeting"),
+                    ("meetingcancel", "Cancel a scheduled meeting"),
+                    ("meetingreschedule", "Reschedule a meeting"),
                     ("teamassign", "Add member to team"),
                     ("teamremove", "Remove member from team"),
+                    ("teambulkassign", "Add many members to a team"),
+                    ("teambulkremove", "Remove many members from a team"),
                     ("teamlist", "List team members")
                 ]
             },
@@ -163,6 +172,8 @@ class HelpCog(commands.GroupCog, name="help"):
                 "commands": [
                     ("ticketsetup", "Set up ticket system"),
                     ("closeticket", "Close a ticket"),
+                    ("ticketsearch", "Search archived tickets"),
+                    ("tickettranscript", "Retrieve an archived transcript"),
                     ("addticketadmin", "Add ticket admin"),
                     ("ticketstats", "View ticket statistics")
                 ]
@@ -3,41 +3,53 @@ from discord import app_commands
 from discord.ext import commands
 from typing import Optional
 import datetime
-import json
-import os
+import re
+
+from utils.bulk import BulkRunner, Purge, bulk_ban, parse_ids
+from utils.cache import resolve_members, role_members
+from utils.storage import read_legacy_json, retire_legacy_file
+
+# Permission overwrites being edited at once by guild-wide operations
+BULK_CONCURRENCY = 5
+# Most messages a single /purge will search through
+PURGE_LIMIT = 10000
+# Most users a single /massban will ban
+MASS_BAN_LIMIT = 1000
 
 class ModerationCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.warnings = {}
-        self.mod_logs = {}
-        self._load_data()
-
-    def _load_data(self):
-        if os.path.exists('warnings.json'):
-            with open('warnings.json', 'r') as f:
-                self.warnings = json.load(f)
-        if os.path.exists('mod_logs.json'):
-            with open('mod_logs.json', 'r') as f:
-                self.mod_logs = json.load(f)
-
-    def _save_data(self):
-        with open('warnings.json', 'w') as f:
-            json.dump(self.warnings, f)
-        with open('mod_logs.json', 'w') as f:
-            json.dump(self.mod_logs, f)
-
-    def _log_action(self, guild_id: str, action: str, moderator: str, target: str, reason: str):
-        if str(guild_id) not in self.mod_logs:
-            self.mod_logs[str(guild_id)] = []
-        self.mod_logs[str(guild_id)].append({
-            'action': action,
-            'moderator': moderator,
-            'target': target,
-            'reason': reason,
-            'timestamp': datetime.datetime.utcnow().isoformat()
-        })
-        self._save_data()
+        self.storage = bot.storage
+
+    async def cog_load(self):
+        warnings = await read_legacy_json('warnings.json')
+        mod_logs = await read_legacy_json('mod_logs.json')
+        if warnings is None and mod_logs is None:
+            return
+
+        await self.storage.executemany(
+            "INSERT INTO warnings (guild_id, member_id, reason, timestamp) VALUES (?, ?, ?, ?)",
+            [(int(guild_id), int(member_id), entry['reason'], entry['timestamp'])
+             for guild_id, members in (warnings or {}).items()
+             for member_id, entries in members.items()
+             for entry in entries]
+        )
+        await self.storage.executemany(
+            "INSERT INTO mod_logs (guild_id, action, moderator, target, reason, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            [(int(guild_id), log['action'], log['moderator'], log['target'], log['reason'], log['timestamp'])
+             for guild_id, logs in (mod_logs or {}).items()
+             for log in logs]
+        )
+        await self.storage.commit()
+        retire_legacy_file('warnings.json')
+        retire_legacy_file('mod_logs.json')
+
+    def log_action(self, guild_id: str, action: str, moderator: str, target: str, reason: str):
+        self.storage.write_behind(
+            "INSERT INTO mod_logs (guild_id, action, moderator, target, reason, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            None,
+            (int(guild_id), action, moderator, target, reason, datetime.datetime.utcnow().isoformat())
+        )
 
     @app_commands.command()
     @app_commands.checks.has_permissions(kick_members=True)
@@ -73,6 +85,58 @@ class ModerationCog(commands.Cog):
         )
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command()
+    @app_commands.checks.has_permissions(ban_members=True)
+    @app_commands.describe(
+        users="User IDs or mentions, separated by spaces",
+        role="Ban every member with this role",
+        delete_days="Days of their messages to delete (0-7)"
+    )
+    async def massban(self, interaction: discord.Interaction, users: Optional[str] = None, role: Optional[discord.Role] = None,
+                      reason: Optional[str] = None, delete_days: app_commands.Range[int, 0, 7] = 1):
+        """Ban many users at once"""
+        if role is not None and role.is_default():
+            return await interaction.response.send_message("You can't mass ban @everyone!", ephemeral=True)
+
+        too_many = f"You can ban at most {MASS_BAN_LIMIT} users at once"
+        user_ids = parse_ids(users)
+        if len(user_ids) > MASS_BAN_LIMIT:
+            return await interaction.response.send_message(too_many, ephemeral=True)
+
+        # Members may have to be requested, which can take a while. The
+        # result is public, so anything sent from here on is too
+        await interaction.response.defer(thinking=True)
+        if role is not None:
+            user_ids = list(dict.fromkeys(user_ids + [member.id for member in await role_members(role)]))
+            if len(user_ids) > MASS_BAN_LIMIT:
+                return await interaction.edit_original_response(content=too_many)
+
+        # Same hierarchy rule as /ban; users no longer in the server are fine
+        protected = {interaction.user.id, self.bot.user.id}
+        members = await resolve_members(interaction.guild, user_ids)
+        skipped = []
+        for user_id in user_ids:
+            member = members.get(user_id)
+            if user_id in protected or (member is not None and member.top_role >= interaction.user.top_role):
+                skipped.append(user_id)
+        user_ids = [user_id for user_id in user_ids if user_id not in skipped]
+        if not user_ids:
+            return await interaction.edit_original_response(content="No users to ban!")
+
+        reason = reason or f"Mass banned by {interaction.user}"
+        banned, failed = await bulk_ban(interaction.guild, user_ids, reason, delete_days * 86400)
+        self.log_action(str(interaction.guild.id), 'massban', str(interaction.user), f"{len(banned)} users",
+                        f"{reason} ({len(failed)} failed, {len(skipped)} skipped)")
+
+        embed = discord.Embed(
+            title="Mass Ban",
+            description=f"**{len(banned)}** users were banned by {interaction.user.mention}\nReason: {reason}",
+            color=discord.Color.dark_red()
+        )
+        if failed or skipped:
+            embed.set_footer(text=f"{len(failed)} failed, {len(skipped)} skipped")
+        await interaction.followup.send(embed=embed)
+
     @app_commands.command()
     @app_commands.checks.has_permissions(moderate_members=True)
     async def timeout(self, interaction: discord.Interaction, member: discord.Member, duration: int, unit: str, reason: Optional[str] = None):
@@ -99,33 +163,63 @@ class ModerationCog(commands.Cog):
 
     @app_commands.command()
     @app_commands.checks.has_permissions(manage_messages=True)
-    async def purge(self, interaction: discord.Interaction, amount: int):
+    @app_commands.describe(
+        amount=f"Number of recent messages to search (1-{PURGE_LIMIT})",
+        member="Only delete messages from this user",
+        pattern="Only delete messages matching this regular expression",
+        attachments="Only delete messages with (or without) attachments",
+        hours="Only delete messages from the last N hours"
+    )
+    async def purge(self, interaction: discord.Interaction, amount: int, member: Optional[discord.User] = None,
+                    pattern: Optional[str] = None, attachments: Optional[bool] = None, hours: Optional[int] = None):
         """Delete a specified number of messages"""
-        if amount < 1 or amount > 100:
-            return await interaction.response.send_message("Please specify a number between 1 and 100", ephemeral=True)
-        
-        await interaction.response.defer(ephemeral=True)
-        deleted = await interaction.channel.purge(limit=amount)
-        await interaction.followup.send(f"Deleted {len(deleted)} messages.", ephemeral=True)
+        if amount < 1 or amount > PURGE_LIMIT:
+            return await interaction.response.send_message(f"Please specify a number between 1 and {PURGE_LIMIT}", ephemeral=True)
+
+        try:
+            regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            return await interaction.response.send_message(f"Invalid pattern: {e}", ephemeral=True)
+
+        def check(message: discord.Message):
+            if member is not None and message.author.id != member.id:
+                return False
+            if attachments is not None and bool(message.attachments) != attachments:
+                return False
+            return regex is None or regex.search(message.content) is not None
+
+        async def progress(purge):
+            await interaction.edit_original_response(content=f"Purging: {purge.deleted} deleted, {purge.scanned} searched")
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        after = discord.utils.utcnow() - datetime.timedelta(hours=hours) if hours else None
+        purge = await Purge(interaction.channel, check, progress).run(amount, after=after)
+        self.log_action(str(interaction.guild.id), 'purge', str(interaction.user), interaction.channel.name, f"{purge.deleted} messages")
+
+        message = f"Deleted {purge.deleted} messages."
+        if purge.failed:
+            message += f" {purge.failed} could not be deleted."
+        try:
+            await interaction.edit_original_response(content=message)
+        except discord.HTTPException:
+            # Old messages are deleted one by one, so a large purge can outlive
+            # the interaction token; tell the moderator directly instead
+            try:
+                await interaction.user.send(f"Purge in {interaction.channel.mention} finished. {message}")
+            except discord.HTTPException:
+                pass
 
     @app_commands.command()
     @app_commands.checks.has_permissions(moderate_members=True)
     async def warn(self, interaction: discord.Interaction, member: discord.Member, reason: str):
         """Warn a member"""
         guild_id = str(interaction.guild.id)
-        member_id = str(member.id)
-        
-        if guild_id not in self.warnings:
-            self.warnings[guild_id] = {}
-        if member_id not in self.warnings[guild_id]:
-            self.warnings[guild_id][member_id] = []
-            
-        self.warnings[guild_id][member_id].append({
-            'reason': reason,
-            'timestamp': datetime.datetime.utcnow().isoformat()
-        })
-        self._save_data()
-        self._log_action(guild_id, 'warn', str(interaction.user), str(member), reason)
+        self.storage.write_behind(
+            "INSERT INTO warnings (guild_id, member_id, reason, timestamp) VALUES (?, ?, ?, ?)",
+            None,
+            (interaction.guild.id, member.id, reason, datetime.datetime.utcnow().isoformat())
+        )
+        self.log_action(guild_id, 'warn', str(interaction.user), str(member), reason)
         
         await interaction.response.send_message(f"Warned {member.mention} for: {reason}")
 
@@ -135,14 +229,34 @@ class ModerationCog(commands.Cog):
         """Mute a member"""
         muted_role = discord.utils.get(interaction.guild.roles, name="Muted")
         if not muted_role:
+            # Setting up the role touches every channel, which can take a while
+            await interaction.response.defer(thinking=True)
             muted_role = await interaction.guild.create_role(name="Muted")
-            for channel in interaction.guild.channels:
-                await channel.set_permissions(muted_role, send_messages=False)
-        
+            await self._bulk_overwrite(interaction, "Setting up the Muted role", muted_role, send_messages=False)
+
         await member.add_roles(muted_role)
-        self._log_action(str(interaction.guild.id), 'mute', str(interaction.user), str(member), f"Duration: {duration if duration else 'indefinite'}")
-        
-        await interaction.response.send_message(f"Muted {member.mention}")
+        self.log_action(str(interaction.guild.id), 'mute', str(interaction.user), str(member), f"Duration: {duration if duration else 'indefinite'}")
+
+        if interaction.response.is_done():
+            await interaction.edit_original_response(content=f"Muted {member.mention}")
+        else:
+            await interaction.response.send_message(f"Muted {member.mention}")
+
+    async def _bulk_overwrite(self, interaction: discord.Interaction, action: str, target, channels=None, **permissions):
+        """Update one target's overwrite on many channels, reporting progress"""
+        channels = interaction.guild.channels if channels is None else channels
+
+        def update(channel):
+            # Only touch the given permissions, keep the rest of the overwrite
+            overwrite = channel.overwrites_for(target)
+            overwrite.update(**permissions)
+            return lambda: channel.set_permissions(target, overwrite=overwrite)
+
+        async def progress(runner):
+            await interaction.edit_original_response(content=f"{action}: {runner.finished}/{runner.total} channels")
+
+        runner = BulkRunner(BULK_CONCURRENCY, progress)
+        return await runner.run(map(update, channels), total=len(channels))
 
     @app_commands.command()
     @app_commands.checks.has_permissions(moderate_members=True)
@@ -151,40 +265,61 @@ class ModerationCog(commands.Cog):
         muted_role = discord.utils.get(interaction.guild.roles, name="Muted")
         if muted_role in member.roles:
             await member.remove_roles(muted_role)
-            self._log_action(str(interaction.guild.id), 'unmute', str(interaction.user), str(member), "N/A")
+            self.log_action(str(interaction.guild.id), 'unmute', str(interaction.user), str(member), "N/A")
             await interaction.response.send_message(f"Unmuted {member.mention}")
         else:
             await interaction.response.send_message(f"{member.mention} is not muted", ephemeral=True)
 
     @app_commands.command()
     @app_commands.checks.has_permissions(manage_channels=True)
-    async def lockchannel(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None):
+    @app_commands.describe(server_wide="Lock every text channel in the server")
+    async def lockchannel(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None, server_wide: bool = False):
         """Lock a channel"""
+        if server_wide:
+            return await self._lockdown(interaction, 'lockdown', "Locking", send_messages=False)
+
         channel = channel or interaction.channel
         await channel.set_permissions(interaction.guild.default_role, send_messages=False)
-        self._log_action(str(interaction.guild.id), 'lock', str(interaction.user), channel.name, "N/A")
+        self.log_action(str(interaction.guild.id), 'lock', str(interaction.user), channel.name, "N/A")
         await interaction.response.send_message(f"Locked {channel.mention}")
 
     @app_commands.command()
     @app_commands.checks.has_permissions(manage_channels=True)
-    async def unlockchannel(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None):
+    @app_commands.describe(server_wide="Unlock every text channel in the server")
+    async def unlockchannel(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None, server_wide: bool = False):
         """Unlock a channel"""
+        if server_wide:
+            return await self._lockdown(interaction, 'unlockdown', "Unlocking", send_messages=None)
+
         channel = channel or interaction.channel
         await channel.set_permissions(interaction.guild.default_role, send_messages=None)
-        self._log_action(str(interaction.guild.id), 'unlock', str(interaction.user), channel.name, "N/A")
+        self.log_action(str(interaction.guild.id), 'unlock', str(interaction.user), channel.name, "N/A")
         await interaction.response.send_message(f"Unlocked {channel.mention}")
 
+    async def _lockdown(self, interaction: discord.Interaction, action: str, verb: str, **permissions):
+        await interaction.response.defer(thinking=True)
+        channels = interaction.guild.text_channels
+        runner = await self._bulk_overwrite(interaction, verb, interaction.guild.default_role, channels, **permissions)
+        self.log_action(str(interaction.guild.id), action, str(interaction.user), "all channels", f"{runner.done}/{runner.total} channels")
+
+        message = f"{verb} done: {runner.done}/{runner.total} channels updated"
+        if runner.failed:
+            message += f", {runner.failed} failed"
+        await interaction.edit_original_response(content=message)
+
     @app_commands.command()
     @app_commands.checks.has_permissions(view_audit_log=True)
     async def modlog(self, interaction: discord.Interaction, limit: int = 10):
         """View recent moderation actions"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.mod_logs or not self.mod_logs[guild_id]:
+        logs = await self.storage.fetchall(
+            "SELECT * FROM mod_logs WHERE guild_id = ? ORDER BY id DESC LIMIT ?",
+            (interaction.guild.id, limit)
+        )
+        if not logs:
             return await interaction.response.send_message("No moderation logs found", ephemeral=True)
         
-        logs = self.mod_logs[guild_id][-limit:]
         embed = discord.Embed(title="Moderation Logs", color=discord.Color.blue())
-        for log in logs:
+        for log in reversed(logs):
             embed.add_field(
                 name=f"{log['action'].upper()} - {log['timestamp']}",
                 value=f"Moderator: {log['moderator']}\nTarget: {log['target']}\nReason: {log['reason']}",
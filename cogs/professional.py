@@ -2,31 +2,39 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from typing import Optional
-import json
 import datetime
 import asyncio
 
+from utils.cache import defer_for_members, reply, role_members
+from utils.ratelimit import rate_limit
+from utils.storage import read_legacy_json, retire_legacy_file
+
 class ProfessionalCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.faq_data = {}
-        self.resources = {}
-        self._load_data()
-
-    def _load_data(self):
-        try:
-            with open('faq.json', 'r') as f:
-                self.faq_data = json.load(f)
-            with open('resources.json', 'r') as f:
-                self.resources = json.load(f)
-        except FileNotFoundError:
-            pass
+        self.storage = bot.storage
 
-    def _save_data(self):
-        with open('faq.json', 'w') as f:
-            json.dump(self.faq_data, f)
-        with open('resources.json', 'w') as f:
-            json.dump(self.resources, f)
+    async def cog_load(self):
+        faq_data = await read_legacy_json('faq.json')
+        if faq_data is not None:
+            await self.storage.executemany(
+                "INSERT OR REPLACE INTO faq (guild_id, topic, content) VALUES (?, ?, ?)",
+                [(int(guild_id), topic, content)
+                 for guild_id, entries in faq_data.items()
+                 for topic, content in entries.items()]
+            )
+        resources = await read_legacy_json('resources.json')
+        if resources is not None:
+            await self.storage.executemany(
+                "INSERT INTO resources (guild_id, topic, name, url) VALUES (?, ?, ?, ?)",
+                [(int(guild_id), topic, resource['name'], resource['url'])
+                 for guild_id, topics in resources.items()
+                 for topic, entries in topics.items()
+                 for resource in entries]
+            )
+        await self.storage.commit()
+        retire_legacy_file('faq.json')
+        retire_legacy_file('resources.json')
 
     @app_commands.command()
     async def standup(self, interaction: discord.Interaction, team_name: str, type: str = "daily"):
@@ -56,23 +64,27 @@ class ProfessionalCog(commands.Cog):
     @app_commands.checks.has_permissions(manage_messages=True)
     async def faq(self, interaction: discord.Interaction, action: str, topic: str, content: Optional[str] = None):
         """Manage FAQ entries"""
-        guild_id = str(interaction.guild.id)
-        
         if action.lower() == "add":
-            if guild_id not in self.faq_data:
-                self.faq_data[guild_id] = {}
-            self.faq_data[guild_id][topic] = content
-            self._save_data()
+            self.storage.write_behind(
+                "INSERT OR REPLACE INTO faq (guild_id, topic, content) VALUES (?, ?, ?)",
+                (interaction.guild.id, topic),
+                (interaction.guild.id, topic, content)
+            )
             await interaction.response.send_message(f"Added FAQ entry for: {topic}")
             
         elif action.lower() == "show":
-            if guild_id in self.faq_data and topic in self.faq_data[guild_id]:
-                embed = discord.Embed(title=f"FAQ: {topic}", description=self.faq_data[guild_id][topic])
+            entry = await self.storage.fetchone(
+                "SELECT content FROM faq WHERE guild_id = ? AND topic = ?",
+                (interaction.guild.id, topic)
+            )
+            if entry is not None:
+                embed = discord.Embed(title=f"FAQ: {topic}", description=entry["content"])
                 await interaction.response.send_message(embed=embed)
             else:
                 await interaction.response.send_message("FAQ entry not found.", ephemeral=True)
 
     @app_commands.command()
+    @rate_limit(2, 300)
     async def feedback(self, interaction: discord.Interaction, topic: str, details: str):
         """Submit feedback"""
         embed = discord.Embed(
@@ -92,10 +104,13 @@ class ProfessionalCog(commands.Cog):
     @app_commands.command()
     async def resources(self, interaction: discord.Interaction, topic: str):
         """Access learning resources"""
-        guild_id = str(interaction.guild.id)
-        if guild_id in self.resources and topic in self.resources[guild_id]:
+        resources = await self.storage.fetchall(
+            "SELECT name, url FROM resources WHERE guild_id = ? AND topic = ? ORDER BY id",
+            (interaction.guild.id, topic)
+        )
+        if resources:
             embed = discord.Embed(title=f"Resources: {topic}", color=discord.Color.blue())
-            for resource in self.resources[guild_id][topic]:
+            for resource in resources:
                 embed.add_field(name=resource['name'], value=resource['url'], inline=False)
             await interaction.response.send_message(embed=embed)
         else:
@@ -120,8 +135,9 @@ class ProfessionalCog(commands.Cog):
         if not role:
             return await interaction.response.send_message("Project/Team not found.", ephemeral=True)
 
+        await defer_for_members(interaction)
+        members = await role_members(role)
         embed = discord.Embed(title=f"Project: {project_name}", color=role.color)
-        members = role.members
         leads = [m for m in members if any(r.name.lower().endswith('lead') for r in m.roles)]
         developers = [m for m in members if m not in leads]
 
@@ -131,23 +147,16 @@ class ProfessionalCog(commands.Cog):
             embed.add_field(name="Team Members", value="\n".join(m.mention for m in developers), inline=False)
         
         embed.set_footer(text=f"Total members: {len(members)}")
-        await interaction.response.send_message(embed=embed)
+        await reply(interaction, embed=embed)
 
     @app_commands.command()
     async def linkproject(self, interaction: discord.Interaction, project_name: str, url: str):
         """Link project resources"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.resources:
-            self.resources[guild_id] = {}
-        
-        if project_name not in self.resources[guild_id]:
-            self.resources[guild_id][project_name] = []
-            
-        self.resources[guild_id][project_name].append({
-            'name': 'Project Link',
-            'url': url
-        })
-        self._save_data()
+        self.storage.write_behind(
+            "INSERT INTO resources (guild_id, topic, name, url) VALUES (?, ?, ?, ?)",
+            None,
+            (interaction.guild.id, project_name, 'Project Link', url)
+        )
         
         embed = discord.Embed(
             title=f"Project Link Added: {project_name}",
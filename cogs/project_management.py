@@ -2,47 +2,76 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from typing import Optional
-import json
 import datetime
 
+from utils.bulk import BulkRunner, parse_ids, role_updates
+from utils.cache import defer_for_members, reply, role_members
+from utils.concurrency import IdAllocator
+from utils.ratelimit import rate_limit
+from utils.storage import read_legacy_json, retire_legacy_file
+
+MEETING_REMINDER_LEAD = datetime.timedelta(minutes=15)
+# Role changes in flight at once for bulk team commands
+TEAM_BULK_CONCURRENCY = 5
+
 class ProjectManagementCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.tasks = {}
-        self.load_tasks()
+        self.storage = bot.storage
+        self.task_ids = IdAllocator(self._load_task_counter, self._store_task_counter)
 
-    def load_tasks(self):
-        try:
-            with open('tasks.json', 'r') as f:
-                self.tasks = json.load(f)
-        except FileNotFoundError:
-            pass
+    async def cog_load(self):
+        self.bot.scheduler.register('meeting', self.send_meeting_reminder)
+
+        tasks = await read_legacy_json('tasks.json')
+        if tasks is None:
+            return
+
+        await self.storage.executemany(
+            "INSERT OR REPLACE INTO tasks (guild_id, id, title, description, assignee, creator, deadline, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(int(guild_id), task["id"], task["title"], task["description"], task["assignee"],
+              task["creator"], task["deadline"], task["status"])
+             for guild_id, guild_tasks in tasks.items()
+             for task in guild_tasks]
+        )
+        await self.storage.commit()
+        retire_legacy_file('tasks.json')
+
+    def cog_unload(self):
+        self.bot.scheduler.unregister('meeting')
+
+    async def _load_task_counter(self, guild_id: int):
+        row = await self.storage.fetchone(
+            "SELECT value FROM counters WHERE guild_id = ? AND name = 'task'", (guild_id,)
+        )
+        if row is None:
+            # Guilds from before task IDs had their own counter
+            row = await self.storage.fetchone(
+                "SELECT COALESCE(MAX(id), 0) AS value FROM tasks WHERE guild_id = ?", (guild_id,)
+            )
+        return row["value"]
 
-    def save_tasks(self):
-        with open('tasks.json', 'w') as f:
-            json.dump(self.tasks, f)
+    def _store_task_counter(self, guild_id: int, value: int):
+        self.storage.write_behind(
+            "INSERT OR REPLACE INTO counters (guild_id, name, value) VALUES (?, 'task', ?)",
+            guild_id,
+            (guild_id, value)
+        )
 
     @app_commands.command()
+    @rate_limit(5, 60)
     async def taskcreate(self, interaction: discord.Interaction, title: str, description: str, 
                         assignee: discord.Member, deadline: str):
         """Create a new task"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.tasks:
-            self.tasks[guild_id] = []
-
-        task_id = len(self.tasks[guild_id]) + 1
-        task = {
-            "id": task_id,
-            "title": title,
-            "description": description,
-            "assignee": assignee.id,
-            "creator": interaction.user.id,
-            "deadline": deadline,
-            "status": "In Progress"
-        }
-        
-        self.tasks[guild_id].append(task)
-        self.save_tasks()
+        task_id = await self.task_ids.next(interaction.guild.id)
+        self.storage.write_behind(
+            "INSERT OR REPLACE INTO tasks (guild_id, id, title, description, assignee, creator, deadline, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (interaction.guild.id, task_id),
+            (interaction.guild.id, task_id, title, description, assignee.id,
+             interaction.user.id, deadline, "In Progress")
+        )
 
         embed = discord.Embed(
             title=f"Task #{task_id}: {title}",
@@ -56,97 +85,161 @@ class ProjectManagementCog(commands.Cog):
     @app_commands.command()
     async def taskupdate(self, interaction: discord.Interaction, task_id: int, status: str):
         """Update task status"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.tasks:
-            return await interaction.response.send_message("No tasks found.", ephemeral=True)
-
-        for task in self.tasks[guild_id]:
-            if task["id"] == task_id:
-                task["status"] = status
-                self.save_tasks()
-                await interaction.response.send_message(f"Task #{task_id} status updated to: {status}")
-                return
-
-        await interaction.response.send_message("Task not found.", ephemeral=True)
+        updated = await self.storage.execute(
+            "UPDATE tasks SET status = ? WHERE guild_id = ? AND id = ?",
+            (status, interaction.guild.id, task_id)
+        )
+        if updated:
+            await interaction.response.send_message(f"Task #{task_id} status updated to: {status}")
+        else:
+            await interaction.response.send_message("Task not found.", ephemeral=True)
 
     @app_commands.command()
     async def tasklist(self, interaction: discord.Interaction, status: Optional[str] = None):
         """List all tasks"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.tasks or not self.tasks[guild_id]:
+        if status:
+            tasks = await self.storage.fetchall(
+                "SELECT * FROM tasks WHERE guild_id = ? AND status = ? COLLATE NOCASE ORDER BY id",
+                (interaction.guild.id, status)
+            )
+        else:
+            tasks = await self.storage.fetchall(
+                "SELECT * FROM tasks WHERE guild_id = ? ORDER BY id", (interaction.guild.id,)
+            )
+        if not tasks:
             return await interaction.response.send_message("No tasks found.", ephemeral=True)
 
         embed = discord.Embed(title="Task List", color=discord.Color.blue())
-        for task in self.tasks[guild_id]:
-            if status and task["status"].lower() != status.lower():
-                continue
-            assignee = interaction.guild.get_member(task["assignee"])
+        for task in tasks:
+            # Mentions render without the member being cached
+            assignee = f"<@{task['assignee']}>" if task["assignee"] else "Unknown"
             embed.add_field(
                 name=f"#{task['id']}: {task['title']}",
-                value=f"Status: {task['status']}\nAssignee: {assignee.mention if assignee else 'Unknown'}\nDeadline: {task['deadline']}",
+                value=f"Status: {task['status']}\nAssignee: {assignee}\nDeadline: {task['deadline']}",
                 inline=False
             )
 
         await interaction.response.send_message(embed=embed)
 
+    def _meeting_description(self, meeting):
+        return (f"**Date:** {meeting['date']}\n**Time:** {meeting['time']}\n\n"
+                f"**Agenda:**\n{meeting['agenda']}\n\n**Participants:** {meeting['participants']}")
+
+    def _reminder_time(self, date, time):
+        meeting_time = datetime.datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+        return meeting_time - MEETING_REMINDER_LEAD
+
+    async def _get_meeting(self, interaction: discord.Interaction, meeting_id: int):
+        job = await self.bot.scheduler.get(meeting_id, kind='meeting')
+        if job is None or job[1]["guild_id"] != interaction.guild.id:
+            await interaction.response.send_message("Meeting not found.", ephemeral=True)
+            return None
+
+        meeting = job[1]
+        if meeting["scheduled_by"] != interaction.user.id and not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You can only change meetings you scheduled.", ephemeral=True)
+            return None
+        return meeting
+
     @app_commands.command()
     async def meeting(self, interaction: discord.Interaction, date: str, time: str, agenda: str, participants: str):
         """Schedule a meeting"""
+        meeting = {
+            "guild_id": interaction.guild.id,
+            "channel_id": interaction.channel.id,
+            "scheduled_by": interaction.user.id,
+            "date": date,
+            "time": time,
+            "agenda": agenda,
+            "participants": participants
+        }
         embed = discord.Embed(
             title="📅 Meeting Scheduled",
-            description=f"**Date:** {date}\n**Time:** {time}\n\n**Agenda:**\n{agenda}\n\n**Participants:** {participants}",
+            description=self._meeting_description(meeting),
             color=discord.Color.blue()
         )
         embed.set_footer(text=f"Scheduled by {interaction.user}")
-        
-        # Send meeting notification
-        await interaction.response.send_message(embed=embed)
-        
+
         # Optional: Set up reminder
         try:
-            reminder_time = datetime.datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
-            self.bot.loop.create_task(self.send_meeting_reminder(interaction.channel.id, reminder_time, embed))
+            reminder_time = self._reminder_time(date, time)
         except ValueError:
+            reminder_time = None
+        else:
+            if reminder_time > datetime.datetime.now():
+                meeting_id = await self.bot.scheduler.schedule('meeting', reminder_time.timestamp(), meeting)
+                embed.add_field(name="Meeting ID", value=meeting_id)
+        
+        # Send meeting notification
+        await interaction.response.send_message(embed=embed)
+        if reminder_time is None:
             await interaction.followup.send("Could not set reminder: Invalid date/time format", ephemeral=True)
 
-    async def send_meeting_reminder(self, channel_id, reminder_time, embed):
+    async def send_meeting_reminder(self, meeting):
         """Send meeting reminder 15 minutes before"""
-        now = datetime.datetime.now()
-        if reminder_time > now:
-            wait_time = (reminder_time - now).total_seconds() - 900  # 15 minutes before
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-                channel = self.bot.get_channel(channel_id)
-                if channel:
-                    reminder_embed = discord.Embed(
-                        title="⏰ Meeting Reminder",
-                        description="Meeting starting in 15 minutes!",
-                        color=discord.Color.gold()
-                    )
-                    reminder_embed.add_field(name="Original Meeting Details", value=embed.description)
-                    await channel.send(embed=reminder_embed)
+        channel = self.bot.get_channel(meeting["channel_id"])
+        if channel:
+            reminder_embed = discord.Embed(
+                title="⏰ Meeting Reminder",
+                description="Meeting starting in 15 minutes!",
+                color=discord.Color.gold()
+            )
+            reminder_embed.add_field(name="Original Meeting Details", value=self._meeting_description(meeting))
+            await channel.send(embed=reminder_embed)
+
+    @app_commands.command()
+    async def meetingcancel(self, interaction: discord.Interaction, meeting_id: int):
+        """Cancel a scheduled meeting"""
+        meeting = await self._get_meeting(interaction, meeting_id)
+        if meeting is None:
+            return
+
+        await self.bot.scheduler.cancel(meeting_id)
+        await interaction.response.send_message(f"Meeting #{meeting_id} has been cancelled.")
+
+    @app_commands.command()
+    async def meetingreschedule(self, interaction: discord.Interaction, meeting_id: int, date: str, time: str):
+        """Move a scheduled meeting to a new date and time"""
+        try:
+            reminder_time = self._reminder_time(date, time)
+        except ValueError:
+            return await interaction.response.send_message("Invalid date/time format! Use YYYY-MM-DD and HH:MM", ephemeral=True)
+        if reminder_time <= datetime.datetime.now():
+            return await interaction.response.send_message("Meetings must be at least 15 minutes in the future.", ephemeral=True)
+
+        meeting = await self._get_meeting(interaction, meeting_id)
+        if meeting is None:
+            return
+
+        meeting["date"] = date
+        meeting["time"] = time
+        await self.bot.scheduler.reschedule(meeting_id, reminder_time.timestamp(), meeting)
+
+        embed = discord.Embed(
+            title="📅 Meeting Rescheduled",
+            description=self._meeting_description(meeting),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"Meeting ID: {meeting_id}")
+        await interaction.response.send_message(embed=embed)
 
     @app_commands.command()
     async def taskdelete(self, interaction: discord.Interaction, task_id: int):
         """Delete a task"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.tasks:
-            return await interaction.response.send_message("No tasks found.", ephemeral=True)
+        task = await self.storage.fetchone(
+            "SELECT creator FROM tasks WHERE guild_id = ? AND id = ?",
+            (interaction.guild.id, task_id)
+        )
+        if task is None:
+            return await interaction.response.send_message("Task not found.", ephemeral=True)
 
-        task_found = False
-        for i, task in enumerate(self.tasks[guild_id]):
-            if task["id"] == task_id:
-                if task["creator"] == interaction.user.id or interaction.user.guild_permissions.administrator:
-                    self.tasks[guild_id].pop(i)
-                    self.save_tasks()
-                    task_found = True
-                    await interaction.response.send_message(f"Task #{task_id} has been deleted.")
-                else:
-                    await interaction.response.send_message("You can only delete tasks you created.", ephemeral=True)
-                break
-
-        if not task_found:
-            await interaction.response.send_message("Task not found.", ephemeral=True)
+        if task["creator"] == interaction.user.id or interaction.user.guild_permissions.administrator:
+            await self.storage.execute(
+                "DELETE FROM tasks WHERE guild_id = ? AND id = ?", (interaction.guild.id, task_id)
+            )
+            await interaction.response.send_message(f"Task #{task_id} has been deleted.")
+        else:
+            await interaction.response.send_message("You can only delete tasks you created.", ephemeral=True)
 
     @app_commands.command()
     async def teamassign(self, interaction: discord.Interaction, team_name: str, member: discord.Member):
@@ -174,6 +267,60 @@ class ProjectManagementCog(commands.Cog):
         else:
             await interaction.response.send_message(f"{member.mention} is not in team {team_name}", ephemeral=True)
 
+    @app_commands.command()
+    @app_commands.checks.has_permissions(manage_roles=True)
+    @app_commands.describe(members="User IDs or mentions, separated by spaces", role="Assign every member with this role")
+    async def teambulkassign(self, interaction: discord.Interaction, team_name: str, members: Optional[str] = None, role: Optional[discord.Role] = None):
+        """Assign many members to a team"""
+        team = discord.utils.get(interaction.guild.roles, name=team_name)
+        if not team:
+            team = await interaction.guild.create_role(name=team_name, mentionable=True)
+        await self._bulk_team_update(interaction, team, members, role, add=True)
+
+    @app_commands.command()
+    @app_commands.checks.has_permissions(manage_roles=True)
+    @app_commands.describe(members="User IDs or mentions, separated by spaces", role="Remove every member with this role")
+    async def teambulkremove(self, interaction: discord.Interaction, team_name: str, members: Optional[str] = None, role: Optional[discord.Role] = None):
+        """Remove many members from a team"""
+        team = discord.utils.get(interaction.guild.roles, name=team_name)
+        if not team:
+            return await interaction.response.send_message("Team not found.", ephemeral=True)
+        await self._bulk_team_update(interaction, team, members, role, add=False)
+
+    async def _bulk_team_update(self, interaction: discord.Interaction, team: discord.Role, members: Optional[str],
+                                role: Optional[discord.Role], add: bool):
+        user_ids = parse_ids(members)
+        if role is not None:
+            await defer_for_members(interaction)
+            user_ids = list(dict.fromkeys(user_ids + [member.id for member in await role_members(role)]))
+        if not user_ids:
+            return await reply(interaction, "No members given.", ephemeral=True)
+
+        verb = "Assigning" if add else "Removing"
+
+        async def progress(runner):
+            await interaction.edit_original_response(content=f"{verb} team {team.name}: {runner.finished}/{runner.total} members")
+
+        if not interaction.response.is_done():
+            await interaction.response.defer(thinking=True)
+        reason = f"Team {'assignment' if add else 'removal'} by {interaction.user}"
+        updates = role_updates(interaction.guild, user_ids, team, add, reason)
+        runner = await BulkRunner(TEAM_BULK_CONCURRENCY, progress).run(updates, total=len(user_ids))
+
+        moderation = self.bot.get_cog("ModerationCog")
+        if moderation is not None:
+            moderation.log_action(str(interaction.guild.id), 'teamassign' if add else 'teamremove', str(interaction.user),
+                                  f"{runner.done} members", f"Team {team.name} ({runner.failed} failed)")
+
+        embed = discord.Embed(
+            title="Team Assignment" if add else "Team Removal",
+            description=f"{runner.done} members {'assigned to' if add else 'removed from'} team {team.name}",
+            color=discord.Color.green() if add else discord.Color.orange()
+        )
+        if runner.failed:
+            embed.set_footer(text=f"{runner.failed} failed")
+        await interaction.edit_original_response(content=None, embed=embed)
+
     @app_commands.command()
     async def teamlist(self, interaction: discord.Interaction, team_name: str):
         """List all members in a team"""
@@ -181,14 +328,15 @@ class ProjectManagementCog(commands.Cog):
         if not role:
             return await interaction.response.send_message("Team not found.", ephemeral=True)
 
-        members = role.members
+        await defer_for_members(interaction)
+        members = await role_members(role)
         if not members:
-            return await interaction.response.send_message("No members in this team.", ephemeral=True)
+            return await reply(interaction, "No members in this team.", ephemeral=True)
 
         embed = discord.Embed(title=f"Team {team_name} Members", color=role.color)
         embed.description = "\n".join([member.mention for member in members])
         embed.set_footer(text=f"Total members: {len(members)}")
-        await interaction.response.send_message(embed=embed)
+        await reply(interaction, embed=embed)
 
 async def setup(bot):
     await bot.add_cog(ProjectManagementCog(bot))
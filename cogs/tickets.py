@@ -1,33 +1,129 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from typing import Optional
-import json
+from typing import Literal, Optional
 import asyncio
+import datetime
+import io
+
+from utils.archive import ArchiveRecord, TranscriptArchive
+from utils.cache import resolve_members
+from utils.concurrency import IdAllocator, InFlight, KeyedLimiter
+from utils.metrics import timed_callback
+from utils.storage import read_legacy_json, retire_legacy_file
+from utils.transcripts import Transcript
+
+# Ticket channels being created at once per guild; the rest queue up
+TICKET_CONCURRENCY = 2
+TICKET_ACCESS = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+# Seconds between the closing notice and the channel being deleted
+TICKET_CLOSE_DELAY = 5
+
+class RoutedView(discord.ui.View):
+    """Renders dynamic items without being kept in the view store.
+
+    Clicks are dispatched by the dynamic item classes registered on the bot,
+    so sending one of these costs no memory per message and keeps working
+    across restarts.
+    """
+
+    def __init__(self, *items):
+        super().__init__(timeout=None)
+        for item in items:
+            self.add_item(item)
+
+    def is_dispatchable(self):
+        return False
+
+class TicketCreateButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket:create"):
+    def __init__(self):
+        super().__init__(
+            discord.ui.Button(
+                label="Create Ticket",
+                style=discord.ButtonStyle.primary,
+                emoji="🎫",
+                custom_id="ticket:create"
+            )
+        )
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls()
+
+    @timed_callback
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.client.get_cog("TicketCog").create_ticket(interaction)
+
+class TicketCloseButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket:close:(?P<channel_id>[0-9]+)"):
+    def __init__(self, channel_id: int):
+        self.channel_id = channel_id
+        super().__init__(
+            discord.ui.Button(
+                label="Close Ticket",
+                style=discord.ButtonStyle.danger,
+                emoji="🔒",
+                custom_id=f"ticket:close:{channel_id}"
+            )
+        )
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["channel_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.channel_id != self.channel_id:
+            await interaction.response.send_message("This button can only close its own ticket.", ephemeral=True)
+            return False
+        return True
+
+    @timed_callback
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.client.get_cog("TicketCog").close_ticket(interaction)
 
 class TicketCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.ticket_data = {}
-        self.load_ticket_data()
+        self.storage = bot.storage
+        self.archive = TranscriptArchive(bot.storage)
+        self.overwrite_templates = {}
+        self.provisioning = KeyedLimiter(TICKET_CONCURRENCY)
+        self.ticket_numbers = IdAllocator(self._load_ticket_counter, self._store_ticket_counter)
+        self.creating = InFlight()
+        self.closing = InFlight()
 
-    def load_ticket_data(self):
-        try:
-            with open('tickets.json', 'r') as f:
-                self.ticket_data = json.load(f)
-        except FileNotFoundError:
-            self.ticket_data = {}
+    async def cog_load(self):
+        self.bot.add_dynamic_items(TicketCreateButton, TicketCloseButton)
 
-    def save_ticket_data(self):
-        with open('tickets.json', 'w') as f:
-            json.dump(self.ticket_data, f)
+        ticket_data = await read_legacy_json('tickets.json')
+        if ticket_data is None:
+            return
+
+        await self.storage.executemany(
+            "INSERT OR REPLACE INTO ticket_config (guild_id, category_id, support_role_id, ticket_counter) VALUES (?, ?, ?, ?)",
+            [(int(guild_id), config["category_id"], config["support_role_id"], config["ticket_counter"])
+             for guild_id, config in ticket_data.items()]
+        )
+        await self.storage.executemany(
+            "INSERT OR REPLACE INTO tickets (channel_id, guild_id, user_id, ticket_number, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(int(channel_id), int(guild_id), ticket["user_id"], ticket["ticket_number"], ticket["created_at"])
+             for guild_id, config in ticket_data.items()
+             for channel_id, ticket in config["active_tickets"].items()]
+        )
+        await self.storage.commit()
+        retire_legacy_file('tickets.json')
+
+    def cog_unload(self):
+        self.bot.remove_dynamic_items(TicketCreateButton, TicketCloseButton)
+
+    async def get_ticket_config(self, guild_id: int):
+        return await self.storage.fetchone(
+            "SELECT * FROM ticket_config WHERE guild_id = ?", (guild_id,)
+        )
 
     @app_commands.command()
     @app_commands.checks.has_permissions(administrator=True)
     async def ticketsetup(self, interaction: discord.Interaction, category: Optional[discord.CategoryChannel] = None):
         """Setup the ticket system"""
-        guild_id = str(interaction.guild.id)
-        
         # Create ticket category if not specified
         if not category:
             category = await interaction.guild.create_category("Tickets")
@@ -41,14 +137,14 @@ class TicketCog(commands.Cog):
                 reason="Ticket System Setup"
             )
 
-        # Save ticket configuration
-        self.ticket_data[guild_id] = {
-            "category_id": category.id,
-            "support_role_id": support_role.id,
-            "ticket_counter": 0,
-            "active_tickets": {}
-        }
-        self.save_ticket_data()
+        # Save ticket configuration, keeping the counter so numbers never repeat
+        await self.storage.execute(
+            "INSERT INTO ticket_config (guild_id, category_id, support_role_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET category_id = excluded.category_id, "
+            "support_role_id = excluded.support_role_id",
+            (interaction.guild.id, category.id, support_role.id)
+        )
+        self.overwrite_templates.pop(interaction.guild.id, None)
 
         # Create ticket creation channel
         embed = discord.Embed(
@@ -56,49 +152,72 @@ class TicketCog(commands.Cog):
             description="Click the button below to create a support ticket",
             color=discord.Color.blue()
         )
-        
-        class TicketButton(discord.ui.Button):
-            def __init__(self):
-                super().__init__(
-                    label="Create Ticket",
-                    style=discord.ButtonStyle.primary,
-                    emoji="🎫"
-                )
+        await interaction.response.send_message(embed=embed, view=RoutedView(TicketCreateButton()))
+
+    def get_overwrite_template(self, guild: discord.Guild, config):
+        """Channel overwrites shared by every ticket in a guild, built once"""
+        template = self.overwrite_templates.get(guild.id)
+        if template is None:
+            template = {guild.default_role: discord.PermissionOverwrite(read_messages=False)}
+            support_role = guild.get_role(config["support_role_id"])
+            if support_role:
+                template[support_role] = TICKET_ACCESS
+            self.overwrite_templates[guild.id] = template
+        return template
 
-            async def callback(self, button_interaction: discord.Interaction):
-                await self.view.cog.create_ticket(button_interaction)
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.overwrite_templates.pop(role.guild.id, None)
 
-        view = discord.ui.View(timeout=None)
-        view.add_item(TicketButton())
-        view.cog = self
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.overwrite_templates.pop(guild.id, None)
 
-        await interaction.response.send_message(embed=embed, view=view)
+    async def _load_ticket_counter(self, guild_id: int):
+        config = await self.get_ticket_config(guild_id)
+        return config["ticket_counter"]
+
+    def _store_ticket_counter(self, guild_id: int, value: int):
+        self.storage.write_behind(
+            "UPDATE ticket_config SET ticket_counter = ? WHERE guild_id = ?",
+            guild_id,
+            (value, guild_id)
+        )
 
     async def create_ticket(self, interaction: discord.Interaction):
         """Create a new ticket channel"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.ticket_data:
-            return await interaction.response.send_message("Ticket system not set up!", ephemeral=True)
+        # Drop the second interaction of a double-click
+        key = (interaction.guild.id, interaction.user.id)
+        if not self.creating.claim(key):
+            return await interaction.response.send_message("Your ticket is already being created.", ephemeral=True)
+
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+
+            config = await self.get_ticket_config(interaction.guild.id)
+            if config is None:
+                return await interaction.followup.send("Ticket system not set up!", ephemeral=True)
+
+            async with self.provisioning(interaction.guild.id):
+                await self._provision_ticket(interaction, config)
+        finally:
+            self.creating.release(key)
 
-        # Increment ticket counter
-        self.ticket_data[guild_id]["ticket_counter"] += 1
-        ticket_number = self.ticket_data[guild_id]["ticket_counter"]
+    async def _provision_ticket(self, interaction: discord.Interaction, config):
+        ticket_number = await self.ticket_numbers.next(interaction.guild.id)
         
-        # Get category and create channel
-        category = interaction.guild.get_channel(self.ticket_data[guild_id]["category_id"])
-        support_role = interaction.guild.get_role(self.ticket_data[guild_id]["support_role_id"])
+        # Create the channel with its permissions in a single call
+        category = interaction.guild.get_channel(config["category_id"])
+        overwrites = dict(self.get_overwrite_template(interaction.guild, config))
+        overwrites[interaction.user] = TICKET_ACCESS
 
         ticket_channel = await interaction.guild.create_text_channel(
             f"ticket-{ticket_number}",
             category=category,
-            topic=f"Ticket for {interaction.user}"
+            topic=f"Ticket for {interaction.user}",
+            overwrites=overwrites
         )
 
-        # Set permissions
-        await ticket_channel.set_permissions(interaction.guild.default_role, read_messages=False)
-        await ticket_channel.set_permissions(interaction.user, read_messages=True, send_messages=True)
-        await ticket_channel.set_permissions(support_role, read_messages=True, send_messages=True)
-
         # Create ticket embed
         embed = discord.Embed(
             title=f"Ticket #{ticket_number}",
@@ -107,75 +226,73 @@ class TicketCog(commands.Cog):
         )
         embed.add_field(name="Created by", value=interaction.user.mention)
 
-        class TicketClose(discord.ui.Button):
-            def __init__(self):
-                super().__init__(
-                    label="Close Ticket",
-                    style=discord.ButtonStyle.danger,
-                    emoji="🔒"
-                )
-
-            async def callback(self, button_interaction: discord.Interaction):
-                await self.view.cog.close_ticket(button_interaction, ticket_channel)
-
-        view = discord.ui.View(timeout=None)
-        view.add_item(TicketClose())
-        view.cog = self
-
-        await ticket_channel.send(embed=embed, view=view)
-        await interaction.response.send_message(f"Created ticket {ticket_channel.mention}", ephemeral=True)
+        await ticket_channel.send(embed=embed, view=RoutedView(TicketCloseButton(ticket_channel.id)))
+        await interaction.followup.send(f"Created ticket {ticket_channel.mention}", ephemeral=True)
 
         # Save ticket data
-        self.ticket_data[guild_id]["active_tickets"][str(ticket_channel.id)] = {
-            "user_id": interaction.user.id,
-            "ticket_number": ticket_number,
-            "created_at": discord.utils.utcnow().isoformat()
-        }
-        self.save_ticket_data()
+        self.storage.write_behind(
+            "INSERT OR REPLACE INTO tickets (channel_id, guild_id, user_id, ticket_number, created_at) VALUES (?, ?, ?, ?, ?)",
+            ticket_channel.id,
+            (ticket_channel.id, interaction.guild.id, interaction.user.id, ticket_number, discord.utils.utcnow().isoformat())
+        )
 
     @app_commands.command()
-    async def closeticket(self, interaction: discord.Interaction):
+    async def closeticket(self, interaction: discord.Interaction, transcript_format: Literal["txt", "html"] = "txt",
+                          compress: bool = False):
         """Close a ticket"""
-        guild_id = str(interaction.guild.id)
-        channel_id = str(interaction.channel.id)
+        await self.close_ticket(interaction, transcript_format, compress)
+
+    async def close_ticket(self, interaction: discord.Interaction, transcript_format: str = "txt", compress: bool = False):
+        if not self.closing.claim(interaction.channel.id):
+            return await interaction.response.send_message("This ticket is already being closed.", ephemeral=True)
 
-        if (guild_id not in self.ticket_data or 
-            channel_id not in self.ticket_data[guild_id]["active_tickets"]):
+        try:
+            await self._close_ticket(interaction, transcript_format, compress)
+        finally:
+            self.closing.release(interaction.channel.id)
+
+    async def _close_ticket(self, interaction: discord.Interaction, transcript_format: str, compress: bool):
+        ticket_info = await self.storage.fetchone(
+            "SELECT * FROM tickets WHERE channel_id = ? AND guild_id = ?",
+            (interaction.channel.id, interaction.guild.id)
+        )
+        if ticket_info is None:
             return await interaction.response.send_message("This is not a ticket channel!", ephemeral=True)
 
-        ticket_info = self.ticket_data[guild_id]["active_tickets"][channel_id]
-        
-        # Create transcript
-        messages = []
-        async for message in interaction.channel.history(limit=None, oldest_first=True):
-            messages.append(f"{message.author}: {message.content}")
+        await interaction.response.defer(ephemeral=True)
 
-        transcript = "\n".join(messages)
-        
-        # Create transcript file
-        with open(f"ticket-{ticket_info['ticket_number']}-transcript.txt", "w", encoding="utf-8") as f:
-            f.write(transcript)
-        
-        # Create file object from the saved transcript
-        transcript_file = discord.File(
-            f"ticket-{ticket_info['ticket_number']}-transcript.txt",
-            filename=f"ticket-{ticket_info['ticket_number']}-transcript.txt"
+        # Create transcript
+        record = ArchiveRecord()
+        transcript = Transcript(
+            f"ticket-{ticket_info['ticket_number']}-transcript",
+            fmt=transcript_format,
+            compress=compress,
+            archive=record
         )
+        try:
+            await transcript.write_channel(interaction.channel)
+            await self.archive.append(
+                interaction.guild.id, ticket_info["ticket_number"], ticket_info["user_id"], record
+            )
 
-        # Send transcript to user
-        user = interaction.guild.get_member(ticket_info["user_id"])
-        if user:
-            try:
-                await user.send(
-                    f"Your ticket #{ticket_info['ticket_number']} has been closed.",
-                    file=transcript_file
-                )
-            except:
-                pass
+            # Send transcript to user
+            members = await resolve_members(interaction.guild, [ticket_info["user_id"]])
+            user = members.get(ticket_info["user_id"])
+            if user:
+                try:
+                    await user.send(
+                        f"Your ticket #{ticket_info['ticket_number']} has been closed.",
+                        file=transcript.to_file()
+                    )
+                except discord.HTTPException:
+                    pass
+        finally:
+            transcript.close()
+            record.close()
 
         # Delete channel after confirmation
-        await interaction.response.send_message("Closing ticket in 5 seconds...", ephemeral=True)
-        await asyncio.sleep(5)
+        await interaction.followup.send(f"Closing ticket in {TICKET_CLOSE_DELAY} seconds...", ephemeral=True)
+        await asyncio.sleep(TICKET_CLOSE_DELAY)
         try:
             await interaction.channel.delete()
         except discord.Forbidden:
@@ -185,24 +302,81 @@ class TicketCog(commands.Cog):
             pass  # Channel already deleted
         
         # Remove from active tickets
-        del self.ticket_data[guild_id]["active_tickets"][channel_id]
-        self.save_ticket_data()
+        await self.storage.execute("DELETE FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+
+    async def _check_support(self, interaction: discord.Interaction):
+        config = await self.get_ticket_config(interaction.guild.id)
+        if config is None:
+            await interaction.response.send_message("Ticket system not set up!", ephemeral=True)
+            return False
+
+        if (not interaction.user.guild_permissions.administrator and
+                not interaction.user.get_role(config["support_role_id"])):
+            await interaction.response.send_message("Only ticket support can view archived tickets.", ephemeral=True)
+            return False
+        return True
+
+    @app_commands.command()
+    async def ticketsearch(self, interaction: discord.Interaction, query: Optional[str] = None,
+                           user: Optional[discord.User] = None, date: Optional[str] = None):
+        """Search archived ticket transcripts (date as YYYY-MM-DD)"""
+        if not await self._check_support(interaction):
+            return
 
-        # Clean up transcript file
         try:
-            os.remove(f"ticket-{ticket_info['ticket_number']}-transcript.txt")
-        except:
-            pass
+            closed_on = datetime.date.fromisoformat(date) if date else None
+        except ValueError:
+            return await interaction.response.send_message("Invalid date! Use YYYY-MM-DD", ephemeral=True)
+
+        results, terms = await self.archive.search(
+            interaction.guild.id, query, user.id if user else None, closed_on
+        )
+        if not results:
+            return await interaction.response.send_message("No matching tickets found.", ephemeral=True)
+
+        texts = await asyncio.gather(*(self.archive.read(row) for row in results)) if terms else []
+        embed = discord.Embed(title="Ticket Search", color=discord.Color.blue())
+        for i, row in enumerate(results):
+            value = f"User: <@{row['user_id']}>"
+            if texts:
+                snippet = next(
+                    (line for line in texts[i].splitlines() if any(term in line.lower() for term in terms)),
+                    ""
+                )
+                value += f"\n{discord.utils.escape_markdown(snippet[:200])}"
+            embed.add_field(
+                name=f"Ticket #{row['ticket_number']} - closed {row['closed_at'][:10]}",
+                value=value,
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command()
+    async def tickettranscript(self, interaction: discord.Interaction, ticket_number: int):
+        """Retrieve an archived ticket transcript"""
+        if not await self._check_support(interaction):
+            return
+
+        row = await self.archive.get(interaction.guild.id, ticket_number)
+        if row is None:
+            return await interaction.response.send_message("No archived transcript for that ticket.", ephemeral=True)
+
+        text = await self.archive.read(row)
+        transcript_file = discord.File(
+            io.BytesIO(text.encode("utf-8")),
+            filename=f"ticket-{ticket_number}-transcript.txt"
+        )
+        await interaction.response.send_message(file=transcript_file, ephemeral=True)
 
     @app_commands.command()
     @app_commands.checks.has_permissions(administrator=True)
     async def addticketadmin(self, interaction: discord.Interaction, member: discord.Member):
         """Add a member to ticket support role"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.ticket_data:
+        config = await self.get_ticket_config(interaction.guild.id)
+        if config is None:
             return await interaction.response.send_message("Ticket system not set up!", ephemeral=True)
 
-        support_role = interaction.guild.get_role(self.ticket_data[guild_id]["support_role_id"])
+        support_role = interaction.guild.get_role(config["support_role_id"])
         await member.add_roles(support_role)
         await interaction.response.send_message(f"Added {member.mention} to ticket support team")
 
@@ -210,14 +384,16 @@ class TicketCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def ticketstats(self, interaction: discord.Interaction):
         """View ticket statistics"""
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.ticket_data:
+        config = await self.get_ticket_config(interaction.guild.id)
+        if config is None:
             return await interaction.response.send_message("Ticket system not set up!", ephemeral=True)
 
-        stats = self.ticket_data[guild_id]
+        active = await self.storage.fetchone(
+            "SELECT COUNT(*) AS count FROM tickets WHERE guild_id = ?", (interaction.guild.id,)
+        )
         embed = discord.Embed(title="Ticket Statistics", color=discord.Color.blue())
-        embed.add_field(name="Total Tickets Created", value=stats["ticket_counter"])
-        embed.add_field(name="Active Tickets", value=len(stats["active_tickets"]))
+        embed.add_field(name="Total Tickets Created", value=config["ticket_counter"])
+        embed.add_field(name="Active Tickets", value=active["count"])
         
         await interaction.response.send_message(embed=embed)
 
@@ -1,34 +1,39 @@
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 from typing import Optional
 import datetime
-import asyncio
-import json
+
+from utils.cache import defer_for_members, reply, role_members
+from utils.ratelimit import rate_limit
+from utils.storage import read_legacy_json, retire_legacy_file
 
 class UtilityCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.reminders = []
-        self.reaction_roles = {}
-        self.load_reaction_roles()
-        self.check_reminders.start()
+        self.storage = bot.storage
 
-    def cog_unload(self):
-        self.check_reminders.cancel()
+    async def cog_load(self):
+        self.bot.scheduler.register('reminder', self.send_reminder)
 
-    def load_reaction_roles(self):
-        try:
-            with open('reaction_roles.json', 'r') as f:
-                self.reaction_roles = json.load(f)
-        except FileNotFoundError:
-            pass
+        reaction_roles = await read_legacy_json('reaction_roles.json')
+        if reaction_roles is None:
+            return
 
-    def save_reaction_roles(self):
-        with open('reaction_roles.json', 'w') as f:
-            json.dump(self.reaction_roles, f)
+        await self.storage.executemany(
+            "INSERT OR REPLACE INTO reaction_roles (message_id, role_id, emoji) VALUES (?, ?, ?)",
+            [(int(message_id), entry["role_id"], entry["emoji"])
+             for message_id, entry in reaction_roles.items()]
+        )
+        await self.storage.commit()
+        retire_legacy_file('reaction_roles.json')
+
+    def cog_unload(self):
+        self.bot.scheduler.unregister('reminder')
 
     @app_commands.command()
+    @rate_limit(2, 60)
+    @rate_limit(10, 60, "guild")
     async def poll(self, interaction: discord.Interaction, question: str, option1: str, option2: str, 
                   option3: Optional[str] = None, option4: Optional[str] = None):
         """Create a poll with up to 4 options"""
@@ -54,15 +59,16 @@ class UtilityCog(commands.Cog):
         msg = await interaction.channel.send(embed=embed)
         await msg.add_reaction(emoji)
         
-        self.reaction_roles[str(msg.id)] = {
-            "role_id": role.id,
-            "emoji": emoji
-        }
-        self.save_reaction_roles()
+        self.storage.write_behind(
+            "INSERT OR REPLACE INTO reaction_roles (message_id, role_id, emoji) VALUES (?, ?, ?)",
+            msg.id,
+            (msg.id, role.id, emoji)
+        )
         
         await interaction.response.send_message("Reaction role created!", ephemeral=True)
 
     @app_commands.command()
+    @rate_limit(5, 60)
     async def remindme(self, interaction: discord.Interaction, time: int, unit: str, message: str):
         """Set a reminder"""
         unit_map = {"m": 60, "h": 3600, "d": 86400}
@@ -70,32 +76,20 @@ class UtilityCog(commands.Cog):
             return await interaction.response.send_message("Invalid unit! Use m (minutes), h (hours), or d (days)", ephemeral=True)
         
         seconds = time * unit_map[unit.lower()]
-        reminder_time = datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
-        
-        self.reminders.append({
+        reminder_time = discord.utils.utcnow() + datetime.timedelta(seconds=seconds)
+        await self.bot.scheduler.schedule('reminder', reminder_time.timestamp(), {
             "user_id": interaction.user.id,
             "channel_id": interaction.channel.id,
-            "message": message,
-            "time": reminder_time.timestamp()
+            "message": message
         })
         
         await interaction.response.send_message(f"I'll remind you about '{message}' in {time}{unit}")
 
-    @tasks.loop(seconds=30)
-    async def check_reminders(self):
-        now = datetime.datetime.utcnow().timestamp()
-        to_remove = []
-        
-        for reminder in self.reminders:
-            if reminder["time"] <= now:
-                channel = self.bot.get_channel(reminder["channel_id"])
-                user = self.bot.get_user(reminder["user_id"])
-                if channel and user:
-                    await channel.send(f"{user.mention}, reminder: {reminder['message']}")
-                to_remove.append(reminder)
-        
-        for reminder in to_remove:
-            self.reminders.remove(reminder)
+    async def send_reminder(self, reminder):
+        channel = self.bot.get_channel(reminder["channel_id"])
+        # The user is usually not cached; a raw mention works regardless
+        if channel:
+            await channel.send(f"<@{reminder['user_id']}>, reminder: {reminder['message']}")
 
     @app_commands.command()
     async def userinfo(self, interaction: discord.Interaction, member: Optional[discord.Member] = None):
@@ -111,12 +105,14 @@ class UtilityCog(commands.Cog):
     @app_commands.command()
     async def roleinfo(self, interaction: discord.Interaction, role: discord.Role):
         """Display information about a role"""
+        await defer_for_members(interaction)
+        members = await role_members(role)
         embed = discord.Embed(title=f"Role: {role.name}", color=role.color)
         embed.add_field(name="ID", value=role.id)
-        embed.add_field(name="Members", value=len(role.members))
+        embed.add_field(name="Members", value=len(members))
         embed.add_field(name="Mentionable", value=role.mentionable)
         embed.add_field(name="Created", value=role.created_at.strftime("%Y-%m-%d"))
-        await interaction.response.send_message(embed=embed)
+        await reply(interaction, embed=embed)
 
     @app_commands.command()
     @app_commands.checks.has_permissions(manage_messages=True)
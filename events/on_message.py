@@ -1,82 +1,110 @@
 from discord.ext import commands
-from discord import utils
 import discord
+import re
+
+from utils.emoji_index import EmojiIndex
+from utils.webhooks import WebhookCache
+
+# Rendered custom emojis are matched first so their names are left alone.
+# The closing colon is a lookahead so an unresolved :name: can still close
+# on a colon that opens the next token.
+EMOJI_TOKEN = re.compile(r"<a?:\w+:\d+>|:(\w{2,32})(?=:)")
 
 class emoji(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.index = EmojiIndex()
+        self.webhooks = WebhookCache("Canopus")
 
-    async def getemote(self, arg):
-        emoji = utils.get(self.bot.emojis, name=arg.strip(":"))
-        if emoji is not None:
-            add = "a" if emoji.animated else ""
-            return f"<{add}:{emoji.name}:{emoji.id}>"
-        return None
+    async def cog_load(self):
+        if self.bot.is_ready():
+            self.index.rebuild(self.bot.guilds)
 
-    async def getinstr(self, content):
-        if ":" not in content:
-            return content
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.index.rebuild(self.bot.guilds)
 
-        ret = []
-        spc = content.split(" ")
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.index.add_guild(guild)
 
-        for item in spc:
-            if item.count(":") <= 1:
-                ret.append(item)
-                continue
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        self.index.add_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.index.remove_guild(guild.id)
+        for channel in guild.channels:
+            self.webhooks.forget(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild, before, after):
+        self.index.add_guild(guild)
 
-            if item.startswith("<") and item.endswith(">"):
-                ret.append(item)
+    @commands.Cog.listener()
+    async def on_webhooks_update(self, channel):
+        self.webhooks.invalidate(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.webhooks.forget(channel.id)
+
+    def expand(self, content, guild_id=None):
+        """Replace every resolvable :name: in ``content`` with its emoji.
+
+        Returns ``(content, substituted)``. Content that cannot contain a
+        resolvable token is returned as-is without building a new string.
+        """
+        if content.count(":") < 2:
+            return content, False
+
+        parts = None
+        last = 0
+        for match in EMOJI_TOKEN.finditer(content):
+            name = match.group(1)
+            # Already-rendered emojis, and a colon already used as a closer
+            if name is None or match.start() < last:
+                continue
+            emoji = self.index.get(name, guild_id)
+            if emoji is None:
                 continue
+            if parts is None:
+                parts = []
+            parts.append(content[last:match.start()])
+            parts.append(str(emoji))
+            last = match.end() + 1
 
-            current = ""
-            count = 0
-            for char in item:
-                if char != ":":
-                    current += char
-                else:
-                    if not current or count == 1:
-                        current += " : "
-                        count += 1
-                    else:
-                        ret.append(current.strip())
-                        current = ":"
-                        count = 1
-            ret.append(current.strip())
-
-        return ret
+        if parts is None:
+            return content, False
+        parts.append(content[last:])
+        return "".join(parts), True
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot or ":" not in message.content:
             return
 
-        msg = await self.getinstr(message.content)
-        ret = ""
-        em = False
-
-        for word in msg:
-            if word.startswith(":") and word.endswith(":") and len(word) > 1:
-                emoji = await self.getemote(word)
-                if emoji:
-                    em = True
-                    ret += f" {emoji}"
-                else:
-                    ret += f" {word}"
-            else:
-                ret += f" {word}"
-
-        if em:
-            webhook = utils.get(await message.channel.webhooks(), name="Canopus")
-            if webhook is None:
-                webhook = await message.channel.create_webhook(name="Canopus")
-            
-            await webhook.send(
-                ret.strip(), 
-                username=message.author.display_name, 
-                avatar_url=message.author.display_avatar.url
-            )
+        guild_id = message.guild.id if message.guild else None
+        content, substituted = self.expand(message.content, guild_id)
+
+        if substituted:
+            webhook = await self.webhooks.get(message.channel)
+            try:
+                await self.proxy(webhook, message, content)
+            except discord.NotFound:
+                # Deleted without us seeing the webhooks update
+                self.webhooks.invalidate(message.channel.id)
+                webhook = await self.webhooks.get(message.channel)
+                await self.proxy(webhook, message, content)
             await message.delete()
 
+    async def proxy(self, webhook, message, content):
+        await webhook.send(
+            content,
+            username=message.author.display_name, 
+            avatar_url=message.author.display_avatar.url
+        )
+
 async def setup(bot):
     await bot.add_cog(emoji(bot))
\ No newline at end of file
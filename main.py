@@ -1,17 +1,29 @@
 import discord
 from discord.ext import commands
 import os
+import sys
 from dotenv import load_dotenv
 
+from utils.cache import cache_options
+from utils.metrics import Counter, Gauge, Metrics
+from utils.scheduler import Scheduler
+from utils.stall import StallDetector
+from utils.startup import StartupReport, TimedLoader, current_extension
+from utils.storage import Storage
+from utils.tree import CommandTree
+
 load_dotenv()
 
 class CanopusBot(commands.Bot):
     def __init__(self):
+        self.metrics = Metrics()
         super().__init__(
             command_prefix="/",
-            intents=discord.Intents.all(),
+            **cache_options(os.getenv('CACHE_PROFILE', 'lazy')),
             application_id=int(os.getenv('APP_ID')),
             help_command=None,  # Remove default help command
+            tree_cls=CommandTree,
+            http_trace=self.metrics.trace_config(),
         )
         self.initial_extensions = [
             'cogs.moderation',
@@ -21,16 +33,86 @@ class CanopusBot(commands.Bot):
             'cogs.project_management',
             'cogs.professional',
             'cogs.tickets',
+            'cogs.diagnostics',
             'cogs.help', 
             'events.on_message'
         ]
+        self.storage = Storage(
+            os.getenv('DATABASE_PATH', 'data/canopus.db'),
+            flush_window=float(os.getenv('WRITE_BEHIND_WINDOW', '1.0'))
+        )
+        self.scheduler = Scheduler(self)
+
+        self.metrics.instrument_http(self.http)
+        self.metrics.add(Counter(
+            'canopus_command_rejected_total', "App commands refused by the rate limiter",
+            ('command', 'scope'), self.tree.rate_limiter.rejected
+        ))
+        self.metrics.add(Gauge('canopus_gateway_latency_seconds', "Gateway heartbeat latency", lambda: self.latency))
+        self.stall_detector = StallDetector(float(os.getenv('STALL_THRESHOLD', '0.5')), metrics=self.metrics)
 
     async def setup_hook(self):
-        for ext in self.initial_extensions:
-            await self.load_extension(ext)
+        self.startup = StartupReport()
+        self.stall_detector.start()
+        with self.startup.step('storage'):
+            await self.storage.connect()
+        # Extensions only look each other up at runtime, so they load concurrently
+        await self.startup.load_extensions(self, self.initial_extensions)
+        with self.startup.step('scheduler'):
+            await self.scheduler.start()
+
+        metrics_port = os.getenv('METRICS_PORT')
+        if metrics_port:
+            await self.metrics.listen(os.getenv('METRICS_HOST', '127.0.0.1'), int(metrics_port))
         
-        # Remove default help command and sync all commands
-        await self.tree.sync()
+        # Only upload commands when they changed; a dev guild gets them instantly
+        with self.startup.step('sync'):
+            dev_guild_id = os.getenv('DEV_GUILD_ID')
+            if dev_guild_id:
+                guild = discord.Object(id=int(dev_guild_id))
+                self.tree.copy_global_to(guild=guild)
+                await self.tree.sync_if_changed(self.storage, guild=guild)
+            else:
+                await self.tree.sync_if_changed(self.storage)
+        self.startup.finish()
+
+    async def _load_from_module_spec(self, spec, key):
+        # Time executing the module apart from running its setup()
+        loader = spec.loader
+        spec.loader = TimedLoader(loader)
+        try:
+            await super()._load_from_module_spec(spec, key)
+        finally:
+            spec.loader = loader
+            if key in sys.modules:
+                sys.modules[key].__loader__ = loader
+
+    async def add_cog(self, cog, /, **kwargs):
+        timing = current_extension()
+        if timing is None:
+            return await super().add_cog(cog, **kwargs)
+        timing.advance('construct')
+        try:
+            await super().add_cog(cog, **kwargs)
+        finally:
+            timing.advance('load')
+
+    async def close(self):
+        # Deliveries in flight still need the HTTP session and the database
+        await self.scheduler.stop()
+        await super().close()
+        await self.storage.close()
+        await self.metrics.close()
+        self.stall_detector.stop()
+
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        # Every listener, cog listeners included, is scheduled through here
+        task = super()._schedule_event(self.metrics.timed_listener(coro, event_name), event_name, *args, **kwargs)
+        task.set_name(f"{event_name} {getattr(coro, '__qualname__', '')}".rstrip())
+        return task
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self.metrics.command_finished(interaction, "ok")
 
     async def on_ready(self):
         print(f"{self.user} is ready!")
@@ -41,5 +123,6 @@ class CanopusBot(commands.Bot):
             )
         )
 
-bot = CanopusBot()
-bot.run(os.getenv('BOT_TOKEN'))
+if __name__ == "__main__":
+    bot = CanopusBot()
+    bot.run(os.getenv('BOT_TOKEN'))
@@ -0,0 +1,133 @@
+import asyncio
+import datetime
+import mmap
+import os
+import re
+import tempfile
+import zlib
+
+from utils.transcripts import SPOOL_SIZE, render_text
+
+WORD = re.compile(r"\w{2,}")
+
+
+def words(text):
+    return set(WORD.findall(text.lower()))
+
+
+class ArchiveRecord:
+    """Plain-text transcript compressed incrementally as pages arrive."""
+
+    def __init__(self):
+        self.words = set()
+        self._compressor = zlib.compressobj()
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+    def add_page(self, page):
+        text = "".join(render_text(message) for message in page)
+        self.words.update(words(text))
+        self._buffer.write(self._compressor.compress(text.encode("utf-8")))
+
+    def finish(self):
+        self._buffer.write(self._compressor.flush())
+        self._buffer.seek(0)
+
+    def close(self):
+        self._buffer.close()
+
+
+class TranscriptArchive:
+    """Append-only, per-guild archive of compressed ticket transcripts.
+
+    Each transcript is an independent zlib stream appended to
+    ``<directory>/<guild_id>.archive``. Its offset and length are indexed in
+    the ``transcripts`` table by ticket number, user and close date, and its
+    words in ``transcript_words``, so a search touches only the index and
+    reading a transcript back decompresses just that record through a
+    memory-mapped view of the file.
+    """
+
+    def __init__(self, storage, directory="data/transcripts"):
+        self.storage = storage
+        self.directory = directory
+        self._locks = {}
+
+    def _path(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}.archive")
+
+    def _append_blob(self, guild_id, record):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(guild_id), "ab") as f:
+            offset = f.tell()
+            while chunk := record._buffer.read(64 * 1024):
+                f.write(chunk)
+            length = f.tell() - offset
+            f.flush()
+            os.fsync(f.fileno())
+        return offset, length
+
+    async def append(self, guild_id, ticket_number, user_id, record):
+        # Offsets are only valid if appends to one guild's file never overlap
+        async with self._locks.setdefault(guild_id, asyncio.Lock()):
+            offset, length = await asyncio.to_thread(self._append_blob, guild_id, record)
+
+        row = await self.storage.fetchone(
+            "INSERT INTO transcripts (guild_id, ticket_number, user_id, closed_at, archive_offset, archive_length) "
+            "VALUES (?, ?, ?, ?, ?, ?) RETURNING id",
+            (guild_id, ticket_number, user_id, datetime.datetime.utcnow().isoformat(), offset, length)
+        )
+        await self.storage.executemany(
+            "INSERT OR IGNORE INTO transcript_words (guild_id, word, transcript_id) VALUES (?, ?, ?)",
+            [(guild_id, word, row["id"]) for word in record.words]
+        )
+        return row["id"]
+
+    def _read_blob(self, guild_id, offset, length):
+        with open(self._path(guild_id), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                return zlib.decompress(view[offset:offset + length]).decode("utf-8")
+
+    async def read(self, transcript):
+        """Return the text of a row from the ``transcripts`` table."""
+        return await asyncio.to_thread(
+            self._read_blob, transcript["guild_id"],
+            transcript["archive_offset"], transcript["archive_length"]
+        )
+
+    async def get(self, guild_id, ticket_number):
+        """Latest archived transcript row for a ticket number, or None."""
+        return await self.storage.fetchone(
+            "SELECT * FROM transcripts WHERE guild_id = ? AND ticket_number = ? ORDER BY id DESC LIMIT 1",
+            (guild_id, ticket_number)
+        )
+
+    async def search(self, guild_id, query=None, user_id=None, date=None, limit=10):
+        """Find transcripts containing every word of ``query``.
+
+        ``date`` is a :class:`datetime.date` matched against the close date.
+        """
+        conditions = ["guild_id = ?"]
+        params = [guild_id]
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if date is not None:
+            conditions.append("closed_at >= ? AND closed_at < ?")
+            params.extend([date.isoformat(), (date + datetime.timedelta(days=1)).isoformat()])
+
+        terms = sorted(words(query or ""))
+        if terms:
+            placeholders = ", ".join("?" * len(terms))
+            conditions.append(
+                "id IN (SELECT transcript_id FROM transcript_words "
+                f"WHERE guild_id = ? AND word IN ({placeholders}) "
+                "GROUP BY transcript_id HAVING COUNT(*) = ?)"
+            )
+            params.extend([guild_id, *terms, len(terms)])
+
+        params.append(limit)
+        rows = await self.storage.fetchall(
+            f"SELECT * FROM transcripts WHERE {' AND '.join(conditions)} ORDER BY id DESC LIMIT ?",
+            params
+        )
+        return rows, terms
@@ -0,0 +1,192 @@
+import asyncio
+import datetime
+import re
+
+import discord
+
+# Discord refuses to bulk delete messages older than this
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14)
+BULK_DELETE_SIZE = 100
+BULK_BAN_SIZE = 200
+SNOWFLAKE = re.compile(r"\d{15,20}")
+
+
+def parse_ids(text):
+    """User IDs from a list of raw IDs and/or mentions, in order, deduplicated"""
+    return list(dict.fromkeys(int(match) for match in SNOWFLAKE.findall(text or "")))
+
+
+async def bulk_ban(guild, user_ids, reason=None, delete_message_seconds=86400):
+    """Bans users in chunks of 200 per request, returns (banned, failed) IDs"""
+    banned, failed = [], []
+    for start in range(0, len(user_ids), BULK_BAN_SIZE):
+        chunk = user_ids[start:start + BULK_BAN_SIZE]
+        try:
+            result = await guild.bulk_ban(
+                [discord.Object(id=user_id) for user_id in chunk],
+                reason=reason,
+                delete_message_seconds=delete_message_seconds
+            )
+        except discord.HTTPException:
+            failed.extend(chunk)
+            continue
+        banned.extend(user.id for user in result.banned)
+        failed.extend(user.id for user in result.failed)
+    return banned, failed
+
+
+def role_updates(guild, user_ids, role, add=True, reason=None):
+    """:class:`BulkRunner` calls that add (or remove) ``role`` for each user"""
+    for user_id in user_ids:
+        async def update(user_id=user_id):
+            member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+            if (role in member.roles) == add:
+                return
+            if add:
+                await member.add_roles(role, reason=reason)
+            else:
+                await member.remove_roles(role, reason=reason)
+        yield update
+
+
+class _Progress:
+    """Awaits ``progress(self)`` every ``interval`` seconds while a job runs."""
+
+    def __init__(self, progress=None, interval=2.0):
+        self.progress = progress
+        self.interval = interval
+
+    def _start_reporting(self):
+        return asyncio.create_task(self._report()) if self.progress else None
+
+    async def _stop_reporting(self, reporter):
+        if reporter is not None:
+            reporter.cancel()
+        if self.progress:
+            await self._notify()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._notify()
+
+    async def _notify(self):
+        try:
+            await self.progress(self)
+        except discord.HTTPException:
+            # e.g. the interaction token used for progress expired
+            pass
+
+
+class BulkRunner(_Progress):
+    """Runs many REST calls with bounded concurrency and progress reports.
+
+    ``concurrency`` workers pull zero-argument coroutine functions from a
+    shared iterator, so memory does not grow with the size of the job.
+    discord.py already waits out each route's rate-limit bucket (including
+    429 retries) before a call returns; keeping only a few in flight stops
+    one large job from starving the rest of the bot. HTTP errors are counted
+    as failures. ``progress(runner)`` is awaited every ``interval`` seconds
+    and once more when the job finishes.
+    """
+
+    def __init__(self, concurrency=5, progress=None, interval=2.0):
+        super().__init__(progress, interval)
+        self.concurrency = concurrency
+        self.total = None
+        self.done = 0
+        self.failed = 0
+
+    @property
+    def finished(self):
+        return self.done + self.failed
+
+    async def run(self, calls, total=None):
+        iterator = iter(calls)
+        self.total = total
+        reporter = self._start_reporting()
+        try:
+            await asyncio.gather(*(self._worker(iterator) for _ in range(self.concurrency)))
+        finally:
+            await self._stop_reporting(reporter)
+        return self
+
+    async def _worker(self, iterator):
+        for call in iterator:
+            try:
+                await call()
+            except discord.HTTPException:
+                self.failed += 1
+            else:
+                self.done += 1
+
+
+class Purge(_Progress):
+    """Streams a channel's history and deletes the messages matching ``check``.
+
+    History is paged lazily, newest first, and at most one bulk-delete batch
+    is held at a time, so memory stays flat however many messages are
+    scanned. Messages younger than fourteen days go out in batches of 100;
+    older ones can only be deleted one by one and are spaced ``delay``
+    seconds apart to stay clear of that route's strict rate limit.
+    """
+
+    def __init__(self, channel, check=None, progress=None, interval=2.0, delay=1.0):
+        super().__init__(progress, interval)
+        self.channel = channel
+        self.check = check
+        self.delay = delay
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+
+    async def run(self, limit, after=None, before=None):
+        reporter = self._start_reporting()
+        try:
+            batch = []
+            async for message in self.channel.history(limit=limit, after=after, before=before, oldest_first=False):
+                self.scanned += 1
+                if self.check is not None and not self.check(message):
+                    continue
+                if message.id < self._cutoff():
+                    await self._delete_one(message)
+                    continue
+                batch.append(message)
+                if len(batch) == BULK_DELETE_SIZE:
+                    await self._delete_batch(batch)
+                    batch = []
+            if batch:
+                await self._delete_batch(batch)
+        finally:
+            await self._stop_reporting(reporter)
+        return self
+
+    @staticmethod
+    def _cutoff():
+        # Recomputed on use since a long job can outlive the boundary
+        oldest = discord.utils.utcnow() - BULK_DELETE_MAX_AGE + datetime.timedelta(minutes=1)
+        return discord.utils.time_snowflake(oldest)
+
+    async def _delete_batch(self, batch):
+        cutoff = self._cutoff()
+        recent = [message for message in batch if message.id >= cutoff]
+        try:
+            await self.channel.delete_messages(recent)
+        except discord.HTTPException:
+            self.failed += len(recent)
+        else:
+            self.deleted += len(recent)
+        for message in batch:
+            if message.id < cutoff:
+                await self._delete_one(message)
+
+    async def _delete_one(self, message):
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+        except discord.HTTPException:
+            self.failed += 1
+        else:
+            self.deleted += 1
+        await asyncio.sleep(self.delay)
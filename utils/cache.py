@@ -0,0 +1,115 @@
+import discord
+
+# Largest user_ids list the gateway accepts in one member request
+QUERY_MEMBERS_SIZE = 100
+
+
+def _intents():
+    # Welcome messages need member events and the emoji proxy needs message
+    # content; nothing reads presences
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    return intents
+
+
+# What each CACHE_PROFILE keeps in memory:
+#   full     every member and presence, chunked at startup, 1000 messages
+#   lazy     members seen joining or fetched on first use, no messages
+#   minimal  no members at all, fetched for each command that needs them
+CACHE_PROFILES = {
+    'full': lambda: dict(
+        intents=discord.Intents.all(),
+        member_cache_flags=discord.MemberCacheFlags.all(),
+        max_messages=1000,
+        chunk_guilds_at_startup=True,
+    ),
+    'lazy': lambda: dict(
+        intents=_intents(),
+        member_cache_flags=discord.MemberCacheFlags(joined=True, voice=False),
+        max_messages=None,
+        chunk_guilds_at_startup=False,
+    ),
+    'minimal': lambda: dict(
+        intents=_intents(),
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        max_messages=None,
+        chunk_guilds_at_startup=False,
+    ),
+}
+
+
+def cache_options(profile):
+    """Client keyword arguments for a cache profile name"""
+    try:
+        return CACHE_PROFILES[profile]()
+    except KeyError:
+        raise ValueError(f"Unknown cache profile {profile!r}, expected one of {', '.join(CACHE_PROFILES)}") from None
+
+
+def _caches_members(guild):
+    return guild._state.member_cache_flags.joined
+
+
+async def guild_members(guild):
+    """Every member of ``guild``, requesting the member list on first use
+
+    Under the lazy profile the list is cached afterwards; under the minimal
+    profile it is requested again on every call.
+    """
+    if guild.chunked:
+        return guild.members
+    return await guild.chunk(cache=_caches_members(guild))
+
+
+async def role_members(role):
+    """Every member with ``role``, see :func:`guild_members`"""
+    if role.guild.chunked:
+        return role.members
+    members = await guild_members(role.guild)
+    if role.is_default():
+        return members
+    return [member for member in members if member.get_role(role.id) is not None]
+
+
+async def resolve_members(guild, user_ids):
+    """Map of the given IDs to members, requesting those not in the cache
+
+    IDs of users who are not in the guild are left out.
+    """
+    members = {}
+    missing = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member is not None:
+            members[user_id] = member
+        else:
+            missing.append(user_id)
+
+    if missing and not guild.chunked:
+        for start in range(0, len(missing), QUERY_MEMBERS_SIZE):
+            fetched = await guild.query_members(
+                user_ids=missing[start:start + QUERY_MEMBERS_SIZE], limit=QUERY_MEMBERS_SIZE,
+                cache=_caches_members(guild)
+            )
+            members.update((member.id, member) for member in fetched)
+    return members
+
+
+async def defer_for_members(interaction: discord.Interaction):
+    """Defer before a member request that may outlast the response deadline"""
+    if not interaction.guild.chunked and not interaction.response.is_done():
+        await interaction.response.defer(thinking=True)
+
+
+async def reply(interaction: discord.Interaction, content=None, **kwargs):
+    """Respond whether or not :func:`defer_for_members` deferred
+
+    After the (public) defer the reply replaces the thinking message, so it
+    can no longer be ephemeral.
+    """
+    if interaction.response.is_done():
+        kwargs.pop('ephemeral', None)
+        await interaction.edit_original_response(content=content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
@@ -0,0 +1,102 @@
+import asyncio
+
+
+class KeyedLimiter:
+    """Per-key concurrency limit, e.g. at most N operations per guild.
+
+    Callers over the limit wait in FIFO order on that key's semaphore
+    instead of all hitting the API at once. Semaphores are dropped as soon
+    as nothing holds or waits on them, so idle keys cost no memory.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphores = {}
+        self._users = {}
+
+    def __call__(self, key):
+        return _KeyedSlot(self, key)
+
+    async def acquire(self, key):
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.limit)
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._release_user(key)
+            raise
+
+    def release(self, key):
+        self._semaphores[key].release()
+        self._release_user(key)
+
+    def _release_user(self, key):
+        self._users[key] -= 1
+        if not self._users[key]:
+            del self._users[key]
+            del self._semaphores[key]
+
+
+class _KeyedSlot:
+    def __init__(self, limiter, key):
+        self._limiter = limiter
+        self._key = key
+
+    async def __aenter__(self):
+        await self._limiter.acquire(self._key)
+
+    async def __aexit__(self, *exc):
+        self._limiter.release(self._key)
+
+
+class IdAllocator:
+    """Per-key atomic, monotonic ID allocator.
+
+    The current value for a key is loaded once with ``load(key)`` (under a
+    lock for that key only) and from then on incremented in memory, which
+    cannot interleave on the event loop. Every new value is handed to
+    ``store(key, value)`` to persist, typically as a coalesced write-behind.
+    """
+
+    def __init__(self, load, store):
+        self._load = load
+        self._store = store
+        self._values = {}
+        self._locks = {}
+
+    async def next(self, key):
+        if key not in self._values:
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                if key not in self._values:
+                    self._values[key] = await self._load(key)
+            self._locks.pop(key, None)
+
+        value = self._values[key] = self._values[key] + 1
+        self._store(key, value)
+        return value
+
+
+class InFlight:
+    """Keys of operations currently running, to drop duplicate requests.
+
+    Used with component callbacks, where a double-click delivers two
+    interactions for the same action a few milliseconds apart.
+    """
+
+    def __init__(self):
+        self._active = set()
+
+    def __contains__(self, key):
+        return key in self._active
+
+    def claim(self, key):
+        """Mark ``key`` as running. Returns False if it already was."""
+        if key in self._active:
+            return False
+        self._active.add(key)
+        return True
+
+    def release(self, key):
+        self._active.discard(key)
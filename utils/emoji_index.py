@@ -0,0 +1,66 @@
+class EmojiIndex:
+    """O(1) name -> emoji lookup across every guild the bot is in.
+
+    Collision policy: an emoji from the guild the lookup is made for always
+    wins. Otherwise, and within a single guild that has several emojis of
+    the same name, the oldest emoji (lowest ID) wins so the result does not
+    depend on guild or cache ordering.
+    """
+
+    def __init__(self):
+        self._guilds = {}   # guild_id -> {name: emoji}
+        self._owners = {}   # name -> {guild_id, ...}
+        self._global = {}   # name -> winning emoji
+
+    def __len__(self):
+        return len(self._global)
+
+    def rebuild(self, guilds):
+        self._guilds.clear()
+        self._owners.clear()
+        self._global.clear()
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def add_guild(self, guild):
+        """Index ``guild``'s emojis, replacing anything indexed for it before."""
+        if guild.id in self._guilds:
+            self.remove_guild(guild.id)
+
+        names = {}
+        for emoji in guild.emojis:
+            current = names.get(emoji.name)
+            if current is None or emoji.id < current.id:
+                names[emoji.name] = emoji
+        self._guilds[guild.id] = names
+
+        for name, emoji in names.items():
+            self._owners.setdefault(name, set()).add(guild.id)
+            winner = self._global.get(name)
+            if winner is None or emoji.id < winner.id:
+                self._global[name] = emoji
+
+    def remove_guild(self, guild_id):
+        names = self._guilds.pop(guild_id, None)
+        if not names:
+            return
+
+        for name, emoji in names.items():
+            owners = self._owners[name]
+            owners.discard(guild_id)
+            if not owners:
+                del self._owners[name]
+                del self._global[name]
+            elif self._global[name] is emoji:
+                self._global[name] = min(
+                    (self._guilds[owner][name] for owner in owners),
+                    key=lambda e: e.id
+                )
+
+    def get(self, name, guild_id=None):
+        local = self._guilds.get(guild_id)
+        if local is not None:
+            emoji = local.get(name)
+            if emoji is not None:
+                return emoji
+        return self._global.get(name)
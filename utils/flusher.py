@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class WriteBehindFlusher:
+    """Dirty-tracking write-behind buffer.
+
+    Writes are marked with a key; marking the same key again within the
+    window replaces the pending parameters instead of queueing a second
+    write. Once per ``window`` seconds the pending writes are handed to
+    ``write`` as a list of ``(statement, [params, ...])`` runs. A ``None`` key
+    means the write can never be coalesced (e.g. log appends) but is still
+    batched.
+
+    A run that fails to write is logged and dropped rather than raised:
+    flushes are triggered from the timer and from whichever unrelated
+    statement drains the buffer, and neither should see the error.
+    """
+
+    def __init__(self, write, window=1.0):
+        self._write = write
+        self.window = window
+        self._pending = {}
+        self._unique = itertools.count()
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self.requested = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    @property
+    def saved(self):
+        """Number of writes that were coalesced away."""
+        return self.requested - self.written - self.failed - len(self._pending)
+
+    @property
+    def dirty(self):
+        return bool(self._pending)
+
+    def mark(self, statement, key, params):
+        if key is None:
+            key = ('_append', next(self._unique))
+        self._pending[(statement, key)] = params
+        self.requested += 1
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def flush(self):
+        """Write everything pending now. Waits for an in-progress flush."""
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+            # Group consecutive writes to the same statement, keeping order
+            runs = []
+            for (statement, _), params in pending.items():
+                if runs and runs[-1][0] == statement:
+                    runs[-1][1].append(params)
+                else:
+                    runs.append((statement, [params]))
+
+            for statement, params in runs:
+                try:
+                    await self._write([(statement, params)])
+                except Exception:
+                    log.exception("Dropped %d buffered writes that failed: %s", len(params), statement)
+                    self.failed += len(params)
+                else:
+                    self.written += len(params)
+            self.flushes += 1
+
+    async def close(self):
+        """Flush whatever is pending and stop the window timer."""
+        await self.flush()
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def report(self):
+        log.info(
+            "Write-behind flusher: %d writes requested, %d written in %d flushes (%d saved, %d failed)",
+            self.requested, self.written, self.flushes, self.saved, self.failed
+        )
@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import time
+
+import aiohttp
+from aiohttp import web
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# REST route being requested by the current task, for the aiohttp trace hooks
+_route = contextvars.ContextVar('route', default="other")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter; ``values`` may be an existing dict of label tuples"""
+
+    def __init__(self, name, help, labels=(), values=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {} if values is None else values
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in list(self.values.items()):
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    """Value read from ``read()`` at scrape time"""
+
+    def __init__(self, name, help, read):
+        super().__init__(name, help)
+        self.read = read
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.read()}"
+
+
+class Histogram:
+    """Cumulative latency histogram, one series per label tuple"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in list(self.series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, counts):
+                cumulative += hits
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {count}"
+
+
+@contextlib.contextmanager
+def timed(histogram, *labels):
+    """Observe the duration of the block, labelled ``ok`` or ``error``"""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started, *labels, status)
+
+
+def timed_callback(callback):
+    """Time a component callback into ``interaction.client.metrics``"""
+    @functools.wraps(callback)
+    async def wrapper(self, interaction):
+        # Named for the stall detector's reports
+        asyncio.current_task().set_name(f"component {type(self).__name__}")
+        metrics = getattr(interaction.client, 'metrics', None)
+        if metrics is None:
+            return await callback(self, interaction)
+        with timed(metrics.components, type(self).__name__):
+            return await callback(self, interaction)
+    return wrapper
+
+
+class Metrics:
+    """Bot-wide latency histograms and REST counters, served to Prometheus"""
+
+    def __init__(self):
+        self.commands = Histogram('canopus_command_seconds', "App command latency", ('command', 'status'))
+        self.components = Histogram('canopus_component_seconds', "Component callback latency", ('component', 'status'))
+        self.listeners = Histogram('canopus_listener_seconds', "Event listener latency", ('event', 'listener', 'status'))
+        self.jobs = Histogram('canopus_job_seconds', "Scheduled job handler latency", ('kind', 'status'))
+        self.rest = Histogram('canopus_rest_seconds', "REST call latency including rate limit waits", ('route', 'status'))
+        self.responses = Counter('canopus_rest_responses_total', "REST responses by HTTP status", ('route', 'status'))
+        self.rate_limits = Counter('canopus_rest_rate_limited_total', "REST responses that were 429s", ('route',))
+        self.metrics = [self.commands, self.components, self.listeners, self.jobs,
+                        self.rest, self.responses, self.rate_limits]
+        self._runner = None
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+    def command_started(self, interaction):
+        interaction.extras['started'] = time.perf_counter()
+
+    def command_finished(self, interaction, status):
+        started = interaction.extras.get('started')
+        if started is not None and interaction.command is not None:
+            self.commands.observe(time.perf_counter() - started, interaction.command.qualified_name, status)
+
+    def timed_listener(self, coro, event_name):
+        listener = getattr(coro, '__qualname__', event_name)
+
+        @functools.wraps(coro)
+        async def wrapper(*args, **kwargs):
+            with timed(self.listeners, event_name, listener):
+                return await coro(*args, **kwargs)
+        return wrapper
+
+    def instrument_http(self, http):
+        """Time every ``HTTPClient.request`` by route template"""
+        request = http.request
+
+        async def timed_request(route, **kwargs):
+            label = f"{route.method} {route.path}"
+            token = _route.set(label)
+            try:
+                with timed(self.rest, label):
+                    return await request(route, **kwargs)
+            finally:
+                _route.reset(token)
+
+        http.request = timed_request
+
+    def trace_config(self):
+        """aiohttp hooks counting every response, retries included"""
+        async def on_request_end(session, context, params):
+            route = _route.get()
+            self.responses.inc(route, str(params.response.status))
+            if params.response.status == 429:
+                self.rate_limits.inc(route)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    async def listen(self, host, port):
+        app = web.Application()
+        app.router.add_get('/metrics', self._scrape)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _scrape(self, request):
+        return web.Response(
+            body=self.render().encode(),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
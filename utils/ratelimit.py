@@ -0,0 +1,93 @@
+import time
+from collections import Counter, OrderedDict
+
+import discord
+from discord import app_commands
+
+SCOPES = ("user", "guild", "channel", "global")
+
+
+def rate_limit(rate: int, per: float, scope: str = "user"):
+    """Allow ``rate`` uses of an app command every ``per`` seconds per ``scope``
+
+    Can be stacked, e.g. a per-user and a per-guild limit on the same
+    command; a call has to fit in every bucket to go through.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"unknown rate limit scope {scope!r}")
+
+    def decorator(func):
+        callback = func.callback if isinstance(func, app_commands.Command) else func
+        limits = callback.__dict__.setdefault('__rate_limits__', [])
+        limits.append((rate, per, scope))
+        return func
+    return decorator
+
+
+class RateLimiter:
+    """Token buckets keyed by command and scope, kept in memory
+
+    Every command is subject to ``default`` (shared across all commands)
+    plus whatever :func:`rate_limit` declared on it. A bucket that has been
+    idle long enough to refill completely holds no information, so buckets
+    are kept in least-recently-used order and dropped from the front once
+    idle for the longest refill period seen; memory stays proportional to
+    recent activity. ``rejected`` counts refused calls by (command, scope).
+    """
+
+    def __init__(self, default=(5, 10.0, "user"), clock=time.monotonic):
+        self.default = default
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._idle = default[1] if default else 0.0
+        self.rejected = Counter()
+        self.allowed = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def rules(self, command):
+        if self.default:
+            yield "*", self.default
+        for limit in getattr(command.callback, '__rate_limits__', ()):
+            yield command.qualified_name, limit
+
+    def hit(self, command, interaction: discord.Interaction):
+        """Take a token from every bucket, or return the seconds to wait"""
+        now = self.clock()
+        self._evict(now)
+
+        buckets = []
+        for name, (rate, per, scope) in self.rules(command):
+            key = (name, scope, self._scope_id(scope, interaction))
+            tokens, updated = self._buckets.get(key, (rate, now))
+            tokens = min(rate, tokens + (now - updated) * rate / per)
+            if tokens < 1:
+                self.rejected[(name, scope)] += 1
+                return (1 - tokens) * per / rate
+            buckets.append((key, tokens))
+            self._idle = max(self._idle, per)
+
+        for key, tokens in buckets:
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+        self.allowed += 1
+        return 0.0
+
+    def _evict(self, now):
+        while self._buckets:
+            key, (tokens, updated) = next(iter(self._buckets.items()))
+            if now - updated < self._idle:
+                break
+            del self._buckets[key]
+
+    @staticmethod
+    def _scope_id(scope, interaction):
+        if scope == "user":
+            return interaction.user.id
+        if scope == "guild":
+            return interaction.guild_id or interaction.user.id
+        if scope == "channel":
+            return interaction.channel_id
+        return None
+
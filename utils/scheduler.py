@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+
+import discord
+
+from utils.metrics import timed
+
+log = logging.getLogger(__name__)
+
+# Failed deliveries are retried after RETRY_DELAY * 2**attempt seconds, at
+# most RETRY_MAX_DELAY apart, and dropped after RETRY_LIMIT attempts
+RETRY_DELAY = 30
+RETRY_MAX_DELAY = 3600
+RETRY_LIMIT = 10
+
+
+class Scheduler:
+    """Persistent job scheduler driven by a single timer.
+
+    Jobs live in the ``scheduled_jobs`` table; only ``(due, id)`` pairs are
+    kept in memory, in a min-heap. The timer sleeps until the earliest job is
+    due (or until an earlier one is scheduled), loads the payloads of every
+    due job and hands them to the handler registered for their kind, with at
+    most ``max_concurrency`` deliveries in flight. A job is deleted once its
+    handler returns, so jobs that were due while the bot was offline are
+    delivered after the next start. A handler that fails transiently has
+    its job moved later with exponential backoff; only a permanent failure
+    (the channel or user is gone or unreachable) drops it. Jobs of a kind with no handler yet are
+    held back and re-armed when one is registered.
+    """
+
+    def __init__(self, bot, max_concurrency=10, fetch_size=500):
+        self.bot = bot
+        self.storage = bot.storage
+        self.max_concurrency = max_concurrency
+        self.fetch_size = fetch_size
+        self._heap = []
+        self._handlers = {}
+        self._inflight = set()
+        self._deliveries = set()
+        self._parked = {}
+        self._attempts = {}
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._runner = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def register(self, kind, handler):
+        """Deliver jobs of ``kind`` to ``handler(payload)``."""
+        self._handlers[kind] = handler
+        for due, job_id in self._parked.pop(kind, ()):
+            self._push(due, job_id)
+
+    def unregister(self, kind):
+        self._handlers.pop(kind, None)
+
+    async def start(self):
+        rows = await self.storage.fetchall("SELECT id, due FROM scheduled_jobs")
+        self._heap = [(row["due"], row["id"]) for row in rows]
+        heapq.heapify(self._heap)
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the timer and wait for deliveries already in flight."""
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    async def schedule(self, kind, due, payload):
+        """Persist a job due at the POSIX timestamp ``due`` and return its id."""
+        row = await self.storage.fetchone(
+            "INSERT INTO scheduled_jobs (kind, due, payload) VALUES (?, ?, ?) RETURNING id",
+            (kind, due, json.dumps(payload))
+        )
+        self._push(due, row["id"])
+        return row["id"]
+
+    async def get(self, job_id, kind=None):
+        """Return ``(due, payload)`` for a pending job, or None."""
+        row = await self.storage.fetchone(
+            "SELECT * FROM scheduled_jobs WHERE id = ?", (job_id,)
+        )
+        if row is None or (kind is not None and row["kind"] != kind):
+            return None
+        return row["due"], json.loads(row["payload"])
+
+    async def cancel(self, job_id):
+        """Drop a pending job. Its heap entry is discarded when it comes due."""
+        return bool(await self.storage.execute(
+            "DELETE FROM scheduled_jobs WHERE id = ?", (job_id,)
+        ))
+
+    async def reschedule(self, job_id, due, payload=None):
+        """Move a pending job to ``due``, optionally replacing its payload."""
+        if payload is None:
+            updated = await self.storage.execute(
+                "UPDATE scheduled_jobs SET due = ? WHERE id = ?", (due, job_id)
+            )
+        else:
+            updated = await self.storage.execute(
+                "UPDATE scheduled_jobs SET due = ?, payload = ? WHERE id = ?",
+                (due, json.dumps(payload), job_id)
+            )
+        if updated:
+            self._push(due, job_id)
+        return bool(updated)
+
+    def _push(self, due, job_id):
+        heapq.heappush(self._heap, (due, job_id))
+        if self._heap[0][1] == job_id:
+            self._wakeup.set()
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            job_ids = []
+            while self._heap and self._heap[0][0] <= now and len(job_ids) < self.fetch_size:
+                job_ids.append(heapq.heappop(self._heap)[1])
+            await self._dispatch(job_ids, now)
+
+    async def _dispatch(self, job_ids, now):
+        placeholders = ", ".join("?" * len(job_ids))
+        rows = await self.storage.fetchall(
+            f"SELECT * FROM scheduled_jobs WHERE id IN ({placeholders})", job_ids
+        )
+        for row in rows:
+            # Stale heap entry for a job that was moved later; cancelled
+            # jobs have no row at all and never show up here
+            if row["due"] > now or row["id"] in self._inflight:
+                continue
+            handler = self._handlers.get(row["kind"])
+            if handler is None:
+                log.warning("No handler registered for %s job %d, holding it until one is", row["kind"], row["id"])
+                self._parked.setdefault(row["kind"], []).append((row["due"], row["id"]))
+                continue
+
+            await self._semaphore.acquire()
+            self._inflight.add(row["id"])
+            # Referenced until done so a running delivery is never collected
+            task = asyncio.create_task(self._deliver(handler, row))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, handler, row):
+        metrics = getattr(self.bot, 'metrics', None)
+        try:
+            if metrics is None:
+                await handler(json.loads(row["payload"]))
+            else:
+                with timed(metrics.jobs, row["kind"]):
+                    await handler(json.loads(row["payload"]))
+        except (discord.Forbidden, discord.NotFound):
+            log.warning("Scheduled %s job %d can no longer be delivered, dropping it", row["kind"], row["id"])
+            self._finish(row["id"])
+        except Exception:
+            attempt = self._attempts.get(row["id"], 0)
+            if attempt + 1 >= RETRY_LIMIT:
+                log.exception("Scheduled %s job %d failed %d times, dropping it", row["kind"], row["id"], RETRY_LIMIT)
+                self._finish(row["id"])
+            else:
+                log.exception("Scheduled %s job %d failed, retrying", row["kind"], row["id"])
+                self._retry(row["id"], attempt)
+        else:
+            self._finish(row["id"])
+        finally:
+            self._inflight.discard(row["id"])
+            self._semaphore.release()
+
+    def _finish(self, job_id):
+        self._attempts.pop(job_id, None)
+        self.storage.write_behind("DELETE FROM scheduled_jobs WHERE id = ?", job_id, (job_id,))
+
+    def _retry(self, job_id, attempt):
+        self._attempts[job_id] = attempt + 1
+        due = time.time() + min(RETRY_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+        self.storage.write_behind("UPDATE scheduled_jobs SET due = ? WHERE id = ?", job_id, (due, job_id))
+        self._push(due, job_id)
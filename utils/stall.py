@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from utils.metrics import Histogram
+
+log = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class StallDetector:
+    """Measures event loop lag and logs what is blocking the loop.
+
+    A heartbeat task wakes every ``interval`` seconds and records how late
+    it was scheduled. A watchdog thread checks the last heartbeat; once the
+    loop has not answered for ``threshold`` seconds it logs the loop
+    thread's current stack together with the name of the running task
+    (listeners, commands and components name their task after themselves),
+    and logs again with the total duration when the loop recovers.
+    """
+
+    def __init__(self, threshold=0.5, interval=0.1, metrics=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = Histogram('canopus_loop_lag_seconds', "Event loop scheduling delay", buckets=LAG_BUCKETS)
+        if metrics is not None:
+            metrics.add(self.lag)
+        self.stalls = 0
+        self._loop = None
+        self._loop_thread = None
+        self._beat = 0.0
+        self._heartbeat = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start monitoring the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat_forever())
+        self._watchdog = threading.Thread(target=self._watch, name="stall-detector", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def _beat_forever(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._beat = now = time.monotonic()
+            self.lag.observe(max(0.0, now - expected))
+
+    def _watch(self):
+        stalled_since = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold:
+                if stalled_since is not None:
+                    log.warning("Event loop recovered after being blocked for %.2fs", time.monotonic() - stalled_since)
+                    stalled_since = None
+                continue
+            if stalled_since is not None:
+                continue
+
+            stalled_since = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>\n"
+            log.warning(
+                "Event loop blocked for %.2fs while running %s\n%s",
+                blocked, self._describe(), stack.rstrip()
+            )
+
+    def _describe(self):
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        if task is None:
+            return "a callback outside any task"
+        return repr(task.get_name())
@@ -0,0 +1,119 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Timing record of the extension being loaded by the current task
+_current = contextvars.ContextVar('extension_timing', default=None)
+
+PHASES = ('import', 'construct', 'load')
+
+
+def current_extension():
+    """Timing of the extension the calling task is loading, if any"""
+    return _current.get()
+
+
+class ExtensionTiming:
+    """Where the time went while loading one extension
+
+    ``import`` is executing the module, ``construct`` is its ``setup()``
+    up to ``add_cog`` (building the cog), and ``load`` is ``add_cog``
+    itself, which runs ``cog_load`` and registers the commands. Phases
+    are wall time, so while extensions load concurrently they include
+    time other extensions spent running in between.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.mark = self.started
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.total = None
+
+    def advance(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] += now - self.mark
+        self.mark = now
+
+
+class TimedLoader:
+    """Wraps a module loader to time ``exec_module`` into the current extension"""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        timing = _current.get()
+        if timing is not None:
+            timing.mark = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            if timing is not None:
+                timing.advance('import')
+
+
+class StartupReport:
+    """Per-extension and per-step timings of ``setup_hook``"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.extensions = {}
+        self.steps = {}
+        self.total = None
+
+    @contextlib.contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = time.perf_counter() - started
+
+    async def load_extensions(self, bot, names):
+        """Load independent extensions concurrently, timing each one
+
+        Module execution is synchronous, so what overlaps is each cog's
+        ``cog_load``: legacy data files read in threads and database writes.
+        """
+        async def load(name):
+            timing = self.extensions[name] = ExtensionTiming(name)
+            _current.set(timing)
+            try:
+                await bot.load_extension(name)
+            finally:
+                timing.total = time.perf_counter() - timing.started
+
+        with self.step('extensions'):
+            results = await asyncio.gather(*(load(name) for name in names), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        log.info("Startup report:\n%s", self.render())
+
+    def render(self):
+        width = max((len(name) for name in self.extensions), default=9)
+        lines = [f"{'extension':<{width}}  {'import':>8}  {'construct':>9}  {'load':>8}  {'total':>8}"]
+        for timing in sorted(self.extensions.values(), key=lambda timing: timing.total or 0, reverse=True):
+            phases = timing.phases
+            lines.append(
+                f"{timing.name:<{width}}  {phases['import'] * 1000:>6.1f}ms  {phases['construct'] * 1000:>7.1f}ms  "
+                f"{phases['load'] * 1000:>6.1f}ms  {(timing.total or 0) * 1000:>6.1f}ms"
+            )
+        lines.extend(f"{name}: {seconds * 1000:.1f}ms" for name, seconds in self.steps.items())
+        if self.total is not None:
+            lines.append(f"setup_hook: {self.total * 1000:.1f}ms")
+        return "\n".join(lines)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+
+import aiosqlite
+
+from utils.flusher import WriteBehindFlusher
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS warnings (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    member_id INTEGER NOT NULL,
+    reason TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_warnings_member ON warnings (guild_id, member_id);
+
+CREATE TABLE IF NOT EXISTS mod_logs (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    moderator TEXT,
+    target TEXT,
+    reason TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mod_logs_guild ON mod_logs (guild_id, id);
+
+CREATE TABLE IF NOT EXISTS ticket_config (
+    guild_id INTEGER PRIMARY KEY,
+    category_id INTEGER,
+    support_role_id INTEGER,
+    ticket_counter INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    ticket_number INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_guild ON tickets (guild_id);
+
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    ticket_number INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    closed_at TEXT NOT NULL,
+    archive_offset INTEGER NOT NULL,
+    archive_length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transcripts_ticket ON transcripts (guild_id, ticket_number);
+CREATE INDEX IF NOT EXISTS idx_transcripts_user ON transcripts (guild_id, user_id);
+CREATE INDEX IF NOT EXISTS idx_transcripts_closed ON transcripts (guild_id, closed_at);
+
+CREATE TABLE IF NOT EXISTS transcript_words (
+    guild_id INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    transcript_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, word, transcript_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS tasks (
+    guild_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    assignee INTEGER,
+    creator INTEGER,
+    deadline TEXT,
+    status TEXT NOT NULL,
+    PRIMARY KEY (guild_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (guild_id, status COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS counters (
+    guild_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS faq (
+    guild_id INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    content TEXT,
+    PRIMARY KEY (guild_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS resources (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resources_topic ON resources (guild_id, topic);
+
+CREATE TABLE IF NOT EXISTS reaction_roles (
+    message_id INTEGER PRIMARY KEY,
+    role_id INTEGER NOT NULL,
+    emoji TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    due REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_due ON scheduled_jobs (due);
+
+CREATE TABLE IF NOT EXISTS command_sync (
+    scope TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+"""
+
+
+class Storage:
+    """Shared async SQLite store used by every cog.
+
+    A single WAL-mode connection is kept open for the lifetime of the bot.
+    Writes are not committed individually; the first write after a commit
+    schedules one commit ``commit_interval`` seconds later, so a burst of
+    mutations costs a single fsync.
+
+    Writes made through :meth:`write_behind` are additionally buffered and
+    coalesced by key for ``flush_window`` seconds. Every other statement
+    drains that buffer first, so reads always see buffered writes and
+    ordering between the two paths is preserved.
+    """
+
+    def __init__(self, path='data/canopus.db', commit_interval=0.5, flush_window=1.0):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.flusher = WriteBehindFlusher(self._write_batch, flush_window)
+        self._db = None
+        self._commit_task = None
+        # Held while a cursor is open and while committing: SQLite refuses to
+        # commit with a statement still in progress
+        self._statement_lock = asyncio.Lock()
+
+    async def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = await aiosqlite.connect(self.path)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+        await self._db.commit()
+
+    def _mark_dirty(self):
+        if self._commit_task is None or self._commit_task.done():
+            self._commit_task = asyncio.create_task(self._commit_later())
+
+    async def _commit_later(self):
+        await asyncio.sleep(self.commit_interval)
+        async with self._statement_lock:
+            await self._db.commit()
+
+    async def _write_batch(self, runs):
+        for sql, seq_of_params in runs:
+            await self._db.executemany(sql, seq_of_params)
+        self._mark_dirty()
+
+    def write_behind(self, sql, key, params):
+        """Queue a write, replacing any pending write with the same ``key``.
+
+        ``key`` should identify the row being written, e.g. its primary key.
+        Pass ``None`` for writes that must never be coalesced.
+        """
+        self.flusher.mark(sql, key, params)
+
+    async def _drain(self):
+        # Also waits for a flush that is already writing
+        await self.flusher.flush()
+
+    async def commit(self):
+        """Commit pending writes now instead of waiting for the batch window."""
+        await self._drain()
+        if self._commit_task is not None and not self._commit_task.done():
+            self._commit_task.cancel()
+        async with self._statement_lock:
+            await self._db.commit()
+
+    async def execute(self, sql, params=()):
+        """Run a write statement and return the number of affected rows."""
+        await self._drain()
+        async with self._statement_lock, self._db.execute(sql, params) as cursor:
+            rowcount = cursor.rowcount
+        self._mark_dirty()
+        return rowcount
+
+    async def executemany(self, sql, seq_of_params):
+        await self._drain()
+        await self._db.executemany(sql, seq_of_params)
+        self._mark_dirty()
+
+    async def fetchone(self, sql, params=()):
+        # Fetched in one round trip to the connection thread, so no cursor
+        # is ever left open for the batched commit to run into
+        rows = await self.fetchall(sql, params)
+        if not sql.lstrip().upper().startswith("SELECT"):
+            # e.g. UPDATE ... RETURNING
+            self._mark_dirty()
+        return rows[0] if rows else None
+
+    async def fetchall(self, sql, params=()):
+        await self._drain()
+        return await self._db.execute_fetchall(sql, params)
+
+    async def close(self):
+        if self._db is None:
+            return
+        await self.flusher.close()
+        await self.commit()
+        self.flusher.report()
+        await self._db.close()
+        self._db = None
+
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+async def read_legacy_json(path):
+    """Load a pre-SQLite JSON data file off the event loop, or None if absent."""
+    if not os.path.exists(path):
+        return None
+    return await asyncio.to_thread(_read_json, path)
+
+
+def retire_legacy_file(path):
+    """Rename a migrated data file so it is not imported twice."""
+    if os.path.exists(path):
+        os.replace(path, f'{path}.migrated')
@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+import html
+import tempfile
+
+import discord
+
+# Transcripts larger than this roll over from memory to a temp file on disk
+SPOOL_SIZE = 1024 * 1024
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; background: #313338; color: #dbdee1; }}
+.message {{ margin: 8px 0; }}
+.author {{ font-weight: bold; color: #f2f3f5; }}
+.timestamp {{ color: #949ba4; font-size: 0.8em; margin-left: 6px; }}
+.embed {{ border-left: 4px solid #5865f2; background: #2b2d31; padding: 6px 10px; margin: 4px 0; max-width: 520px; }}
+img {{ max-width: 400px; display: block; }}
+a {{ color: #00a8fc; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+
+HTML_FOOTER = "</body>\n</html>\n"
+
+
+def snapshot(message):
+    """Reduce a message to the plain data a transcript needs."""
+    return {
+        "author": str(message.author),
+        "created_at": message.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "content": message.content,
+        "attachments": [(a.filename, a.url, a.content_type or "") for a in message.attachments],
+        "embeds": [embed.to_dict() for embed in message.embeds]
+    }
+
+
+def _embed_lines(embed):
+    for key in ("title", "description"):
+        if embed.get(key):
+            yield embed[key]
+    for field in embed.get("fields", []):
+        yield f"{field['name']}: {field['value']}"
+
+
+def render_text(message):
+    lines = [f"{message['author']}: {message['content']}"]
+    for filename, url, _ in message["attachments"]:
+        lines.append(f"    [attachment] {filename} {url}")
+    for embed in message["embeds"]:
+        lines.extend(f"    [embed] {line}" for line in _embed_lines(embed))
+    return "\n".join(lines) + "\n"
+
+
+def render_html(message):
+    parts = [
+        '<div class="message">',
+        f'<span class="author">{html.escape(message["author"])}</span>'
+        f'<span class="timestamp">{message["created_at"]}</span>'
+    ]
+    if message["content"]:
+        parts.append(f'<div>{html.escape(message["content"])}</div>')
+    for filename, url, content_type in message["attachments"]:
+        url = html.escape(url, quote=True)
+        if content_type.startswith("image/"):
+            parts.append(f'<a href="{url}"><img src="{url}" alt="{html.escape(filename)}"></a>')
+        else:
+            parts.append(f'<div><a href="{url}">{html.escape(filename)}</a></div>')
+    for embed in message["embeds"]:
+        lines = "<br>".join(html.escape(line) for line in _embed_lines(embed))
+        parts.append(f'<div class="embed">{lines}</div>')
+    parts.append("</div>\n")
+    return "\n".join(parts)
+
+
+class Transcript:
+    """A channel transcript streamed page by page into a spooled buffer.
+
+    History is fetched lazily one page at a time; each page is reduced to
+    plain data on the event loop and rendered, optionally gzip-compressed,
+    in a worker thread. Memory use is bounded by the page size rather than
+    the length of the channel. Pages are also fed to ``archive``, an
+    :class:`~utils.archive.ArchiveRecord`, when one is given.
+    """
+
+    def __init__(self, title, fmt="txt", compress=False, page_size=100, archive=None):
+        self.title = title
+        self.archive = archive
+        self.fmt = fmt
+        self.compress = compress
+        self.page_size = page_size
+        self.message_count = 0
+        self._render = render_html if fmt == "html" else render_text
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self._out = gzip.GzipFile(fileobj=self._buffer, mode="wb") if compress else self._buffer
+
+    @property
+    def filename(self):
+        filename = f"{self.title}.{self.fmt}"
+        return f"{filename}.gz" if self.compress else filename
+
+    def _write(self, text):
+        self._out.write(text.encode("utf-8"))
+
+    def _write_page(self, page):
+        self._write("".join(self._render(message) for message in page))
+        if self.archive is not None:
+            self.archive.add_page(page)
+
+    def _finish(self):
+        if self.fmt == "html":
+            self._write(HTML_FOOTER)
+        if self._out is not self._buffer:
+            self._out.close()
+        self._buffer.seek(0)
+        if self.archive is not None:
+            self.archive.finish()
+
+    async def write_channel(self, channel):
+        if self.fmt == "html":
+            await asyncio.to_thread(self._write, HTML_HEADER.format(title=html.escape(self.title)))
+
+        page = []
+        async for message in channel.history(limit=None, oldest_first=True):
+            page.append(snapshot(message))
+            if len(page) >= self.page_size:
+                await asyncio.to_thread(self._write_page, page)
+                self.message_count += len(page)
+                page = []
+        if page:
+            await asyncio.to_thread(self._write_page, page)
+            self.message_count += len(page)
+
+        await asyncio.to_thread(self._finish)
+
+    def to_file(self):
+        return discord.File(self._buffer, filename=self.filename)
+
+    def close(self):
+        self._buffer.close()
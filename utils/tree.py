@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+
+import discord
+from discord import app_commands
+
+from utils.ratelimit import RateLimiter
+
+log = logging.getLogger(__name__)
+
+class CommandTree(app_commands.CommandTree):
+    """Command tree that rate limits and times every app command
+
+    Calls go through a :class:`RateLimiter` first; when the client has
+    ``metrics``, the latency of each accepted call is recorded once it
+    completes or fails.
+
+    :meth:`sync_if_changed` only uploads the commands to Discord when
+    their payload differs from the last one synced for that scope.
+    """
+
+    def __init__(self, client, *, rate_limiter=None, **kwargs):
+        super().__init__(client, **kwargs)
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is not discord.InteractionType.application_command or interaction.command is None:
+            return True
+
+        retry_after = self.rate_limiter.hit(interaction.command, interaction)
+        if retry_after:
+            await interaction.response.send_message(
+                f"You're doing that too often, try again in {math.ceil(retry_after)}s.", ephemeral=True
+            )
+            return False
+
+        # Named for the stall detector's reports
+        asyncio.current_task().set_name(f"command /{interaction.command.qualified_name}")
+        metrics = getattr(self.client, 'metrics', None)
+        if metrics is not None:
+            metrics.command_started(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        metrics = getattr(self.client, 'metrics', None)
+        if metrics is not None:
+            metrics.command_finished(interaction, "error")
+        await super().on_error(interaction, error)
+
+    def fingerprint(self, *, guild=None) -> str:
+        """Stable hash of the payload :meth:`sync` would upload for ``guild``"""
+        payload = sorted((command.to_dict(self) for command in self._get_all_commands(guild=guild)),
+                         key=lambda command: (command['type'], command['name']))
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    async def sync_if_changed(self, storage, *, guild=None) -> bool:
+        """Sync ``guild`` (or the global commands) unless the stored hash matches
+
+        Returns whether commands were uploaded.
+        """
+        scope = f"{self.client.application_id}:{guild.id if guild else 'global'}"
+        digest = self.fingerprint(guild=guild)
+        row = await storage.fetchone("SELECT hash FROM command_sync WHERE scope = ?", (scope,))
+        if row is not None and row['hash'] == digest:
+            log.info("Commands for %s unchanged, skipping sync", scope)
+            return False
+
+        synced = await self.sync(guild=guild)
+        await storage.execute(
+            "INSERT INTO command_sync (scope, hash) VALUES (?, ?) "
+            "ON CONFLICT (scope) DO UPDATE SET hash = excluded.hash",
+            (scope, digest)
+        )
+        await storage.commit()
+        log.info("Synced %d commands for %s", len(synced), scope)
+        return True
@@ -0,0 +1,47 @@
+import asyncio
+import weakref
+
+from discord import utils
+
+
+class WebhookCache:
+    """Lazily filled per-channel cache of the bot's proxy webhook.
+
+    The first message proxied in a channel fetches (or creates) the webhook
+    under a per-channel lock, so concurrent messages cannot race to create
+    duplicates. Entries are dropped when Discord reports a webhook change or
+    the channel goes away. A channel's lock only lives while a task holds
+    or waits on it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._webhooks = {}
+        self._locks = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._webhooks)
+
+    async def get(self, channel):
+        webhook = self._webhooks.get(channel.id)
+        if webhook is not None:
+            return webhook
+
+        lock = self._locks.get(channel.id)
+        if lock is None:
+            lock = self._locks[channel.id] = asyncio.Lock()
+        async with lock:
+            webhook = self._webhooks.get(channel.id)
+            if webhook is None:
+                webhook = utils.get(await channel.webhooks(), name=self.name)
+                if webhook is None:
+                    webhook = await channel.create_webhook(name=self.name)
+                self._webhooks[channel.id] = webhook
+        return webhook
+
+    def invalidate(self, channel_id):
+        self._webhooks.pop(channel_id, None)
+
+    def forget(self, channel_id):
+        """Drop everything held for a channel that no longer exists."""
+        self._webhooks.pop(channel_id, None)